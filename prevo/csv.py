@@ -21,6 +21,8 @@
 
 
 # Standard library
+import re
+from functools import partial
 from pathlib import Path
 
 # Nonstandard
@@ -57,6 +59,14 @@ class CsvFile:
         if column_formats is None and self.column_names is not None:
             self.column_formats = ('',) * len(column_names)
 
+        # Format string for whole lines, e.g. '%.3f\t%s\t%.2f\n' (printf-style
+        # if all column formats allow it, else '{:.3f}\t{:}\t{:.2f}\n')
+        # (avoids parsing formats of every value separately, see _format_line)
+        self.printf_style, self.line_format = self._get_line_format()
+
+        # Lines waiting to be written to file (see _buffer_line())
+        self.buffer = []
+
     def load(self, nrange=None):
         """Load data recorded in path, possibly with a range of indices (n1, n2).
 
@@ -71,35 +81,79 @@ class CsvFile:
         ------
         Pandas DataFrame of the requested size.
         """
-        if nrange is None:
-            kwargs = {}
-        else:
-            n1, n2 = nrange
-            kwargs = {'skiprows': range(1, n1),
-                      'nrows': n2 - n1 + 1}
-
+        kwargs = self._range_kwargs(nrange)
         return pd.read_csv(self.file, delimiter=self.csv_separator, **kwargs)
 
+    @staticmethod
+    def _range_kwargs(nrange):
+        """pandas.read_csv() kwargs to load lines n1 to n2 (see load())."""
+        if nrange is None:
+            return {}
+        n1, n2 = nrange
+        return {'skiprows': range(1, n1), 'nrows': n2 - n1 + 1}
+
     def number_of_lines(self):
         """Return number of lines of a file"""
-        with open(self.file, 'r') as f:
-            for i, line in enumerate(f):
-                pass
-            try:
-                return i + 1
-            except UnboundLocalError:  # handles the case of an empty file
-                return 0
+        n = 0
+        block = b''
+        # Binary mode, by large blocks: no decoding / line splitting needed
+        with open(self.file, 'rb') as f:
+            for block in iter(partial(f.read, 2**20), b''):
+                n += block.count(b'\n')
+        if block and not block.endswith(b'\n'):  # last line without newline
+            n += 1
+        return n
 
     def number_of_measurements(self):
         """Can be subclassed (here, assumes column titles)"""
         return self.number_of_lines() - 1
 
+    def end_of_last_line(self):
+        """Byte position in file just after the last complete line.
+
+        (the file is read backwards from the end, by blocks)
+        """
+        with open(self.file, 'rb') as f:
+            position = f.seek(0, 2)
+            while position > 0:
+                block_size = min(4096, position)
+                f.seek(position - block_size)
+                block = f.read(block_size)
+                n = block.rfind(b'\n')
+                if n >= 0:
+                    return position - block_size + n + 1
+                position -= block_size
+        return 0
+
+    def last_line(self):
+        """Return last complete line of file (str), None if there is none.
+
+        Only the end of the file is read.
+        """
+        end = self.end_of_last_line()
+        if not end:
+            return None
+        with open(self.file, 'rb') as f:
+            position = end - 1  # position of the final newline character
+            while position > 0:
+                block_size = min(4096, position)
+                f.seek(position - block_size)
+                block = f.read(block_size)
+                n = block.rfind(b'\n')
+                if n >= 0:
+                    position = position - block_size + n + 1
+                    break
+                position -= block_size
+            f.seek(position)
+            line = f.read(end - position)
+        return line.decode('utf8').rstrip('\r\n')
+
     # ---------- Methods that work on already opened file managers -----------
 
     def _init_file(self, file):
         """What to do with file when recording is started."""
         # Line below allows the user to re-start the recording and append data
-        if self.number_of_lines() == 0:
+        if not self.file.stat().st_size:
             self._write_columns(file)
 
     def _write_columns(self, file):
@@ -109,11 +163,46 @@ class CsvFile:
         columns_str = f'{self.csv_separator.join(self.column_names)}\n'
         file.write(columns_str)
 
+    # Column formats (format spec mini-language) that have the same meaning
+    # in printf-style formatting, which is faster: '' and e.g. '.3f', '8.2e'
+    printf_compatible = re.compile(r'(|[+ ]?0?\d*(\.\d+)?[eEfFgG])')
+
+    def _get_line_format(self):
+        """Format string to transform column values into a line of file.
+
+        Returns printf_style (bool), line_format (str)
+        """
+        if self.column_formats is None:
+            return False, None
+
+        if all(self.printf_compatible.fullmatch(fmt) for fmt in self.column_formats):
+            separator = self.csv_separator.replace('%', '%%')
+            fields = ['%' + (fmt or 's') for fmt in self.column_formats]
+            return True, separator.join(fields) + '\n'
+
+        separator = self.csv_separator.replace('{', '{{').replace('}', '}}')
+        fields = ['{:' + fmt + '}' for fmt in self.column_formats]
+        return False, separator.join(fields) + '\n'
+
+    def _format_line(self, data):
+        """Transform data (iterable of column values) into line of file."""
+        if self.printf_style:
+            return self.line_format % tuple(data)
+        return self.line_format.format(*data)
+
     def _write_line(self, data, file):
         """Save data to file when file is already open."""
-        data_str = [f'{x:{fmt}}' for x, fmt in zip(data, self.column_formats)]
-        line_for_saving = self.csv_separator.join(data_str) + '\n'
-        file.write(line_for_saving)
+        file.write(self._format_line(data))
+
+    def _buffer_line(self, data):
+        """Store line in memory, to be written later with _flush_buffer()"""
+        self.buffer.append(self._format_line(data))
+
+    def _flush_buffer(self, file):
+        """Write all buffered lines to file (already open) in one go."""
+        if self.buffer:
+            file.write(''.join(self.buffer))
+            self.buffer.clear()
 
     # ----------- Corresponding methods that open the file manager -----------
 
@@ -28,8 +28,23 @@ Can be subclassed for arbitrary measurement formatting.
 
 # Standard library imports
 from abc import ABC, abstractmethod
+from io import BytesIO
 from pathlib import Path
 from queue import Queue
+from threading import Event, Lock
+
+# Non-standard imports
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ModuleNotFoundError:
+    Observer = None
+    FileSystemEventHandler = object
+
+try:
+    import pandas as pd
+except ModuleNotFoundError:
+    pass
 
 # Local imports
 from .csv import CsvFile
@@ -72,6 +87,30 @@ class SavedDataBase(ABC):
         """Transform loaded data into something usable (e.g. by plots etc.)"""
         pass
 
+    # Loading of new data (e.g. for live monitoring) -------------------------
+
+    def reset_new_data(self, skip_existing=False):
+        """Start tracking data added to file (see load_new()).
+
+        If skip_existing is True, data already in file will not be loaded by
+        load_new(); only data added after this call will.
+        """
+        self.n_loaded = self.number_of_measurements() if skip_existing else 0
+
+    def load_new(self):
+        """Load measurements saved since last call into self.data.
+
+        self.data is None if there are no new measurements.
+        Can be subclassed for more efficient loading (see SavedCsvData).
+        """
+        n = self.number_of_measurements()
+        if n <= self.n_loaded:
+            self.data = None
+            return
+        self.load(nrange=(self.n_loaded + 1, n))
+        if self.data is not None:
+            self.n_loaded = n
+
 
 # ========================== Examples of subclasses ==========================
 
@@ -100,11 +139,58 @@ class SavedCsvData(SavedDataBase):
         )
 
     def load(self, nrange=None):
-        self.data = self.csv_file.load(nrange=nrange)
+        kwargs = self.csv_file._range_kwargs(nrange)
+        self.data = self._read_csv(self.csv_file.file, **kwargs)
+
+    def _read_csv(self, file, **kwargs):
+        """Parse CSV data from file or buffer into a pandas DataFrame.
+
+        Used both by load() and load_new(): subclass this method to change
+        parsing (dtypes, converters, etc.) in both cases.
+        """
+        return pd.read_csv(file, delimiter=self.csv_file.csv_separator, **kwargs)
 
     def number_of_measurements(self):
         return self.csv_file.number_of_measurements()
 
+    def reset_new_data(self, skip_existing=False):
+        """Data is tracked with the byte position in file of loaded data."""
+        self.columns = None
+        self.offset = 0
+        # If file does not exist or is still empty (header not written yet),
+        # there is nothing to skip and the header will be read by load_new()
+        file = self.csv_file.file
+        if skip_existing and file.exists() and file.stat().st_size:
+            self.columns = list(self._read_csv(self.csv_file.file, nrows=0).columns)
+            self.offset = self.csv_file.end_of_last_line()
+
+    def load_new(self):
+        """Only read bytes added to file since last call (like tail -f)."""
+        self.data = None
+
+        if self.csv_file.file.stat().st_size < self.offset:
+            self.reset_new_data()  # file has been truncated or replaced
+
+        with open(self.csv_file.file, 'rb') as f:
+            f.seek(self.offset)
+            new_bytes = f.read()
+
+        # Only consider complete lines (last line might be being written)
+        n = new_bytes.rfind(b'\n') + 1
+        if not n:
+            return
+
+        kwargs = {}
+        if self.columns is not None:
+            kwargs = {'header': None, 'names': self.columns}
+
+        data = self._read_csv(BytesIO(new_bytes[:n]), **kwargs)
+        self.columns = list(data.columns)
+        self.offset += n
+
+        if len(data):
+            self.data = data
+
     def format_as_measurement(self):
         """Generate useful attributes for plotting on a Graph() object.
 
@@ -121,6 +207,91 @@ class SavedCsvData(SavedDataBase):
         return measurement
 
 
+# ================== Shared watching of files (with watchdog) =================
+
+
+class FileWatcher(FileSystemEventHandler):
+    """Single watchdog observer shared by all objects monitoring files.
+
+    Each monitored file is associated with a threading.Event which is set
+    every time the file is modified. Requires the watchdog package.
+    """
+
+    _observer = None
+    _watches = {}    # folder: watch scheduled in observer
+    _events = {}     # file: list of threading.Events
+    _lock = Lock()
+
+    # Events signaling that the contents of a file may have changed (in
+    # particular, 'opened' and 'closed_no_write' are excluded because they
+    # are also caused by reading the file, e.g. in load_new());
+    # 'closed' is a close after writing.
+    modifying_events = ('modified', 'created', 'moved', 'closed')
+
+    @classmethod
+    def available(cls):
+        return Observer is not None
+
+    @classmethod
+    def register(cls, file):
+        """Start watching file; return threading.Event set upon modification.
+
+        Returns None if the file does not exist (yet); in this case, the
+        file has to be monitored by other means (e.g. polling its size).
+        """
+        file = Path(file).resolve()
+        folder = file.parent
+        with cls._lock:
+            if not file.exists():
+                return
+            if cls._observer is None:
+                cls._observer = Observer()
+                cls._observer.daemon = True
+                cls._observer.start()
+            if folder not in cls._watches:
+                watch = cls._observer.schedule(cls(), str(folder), recursive=False)
+                cls._watches[folder] = watch
+            event = Event()
+            event.set()  # so that data already in the file is considered
+            cls._events.setdefault(file, []).append(event)
+        return event
+
+    @classmethod
+    def unregister(cls, file, event):
+        """Stop watching file with event (returned by register()).
+
+        The folder stops being watched when no file in it is monitored
+        anymore, and the observer is stopped when no folder is watched.
+        """
+        file = Path(file).resolve()
+        folder = file.parent
+        with cls._lock:
+            events = cls._events.get(file, [])
+            if event in events:
+                events.remove(event)
+            if not events:
+                cls._events.pop(file, None)
+            if any(f.parent == folder for f in cls._events):
+                return
+            watch = cls._watches.pop(folder, None)
+            if watch is not None:
+                cls._observer.unschedule(watch)
+            if not cls._watches and cls._observer is not None:
+                cls._observer.stop()
+                cls._observer.join()
+                cls._observer = None
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in self.modifying_events:
+            return
+        paths = (event.src_path, getattr(event, 'dest_path', None))
+        for path in paths:
+            if not path:
+                continue
+            for file_event in self._events.get(Path(path).resolve(), ()):
+                file_event.set()
+
+
 # =========== Classes to get measurements from files periodically ============
 
 
@@ -145,6 +316,12 @@ class PeriodicMeasurementsFromFile(PeriodicThreadedSystem):
         - only_new: if True, do not put in queue measurements that are already
                     saved in the file when the file monitoring is started.
 
+        NOTE: the file is only read when it has been modified since last
+        check: if the watchdog package is installed, modifications are
+        notified by a file watcher shared between all instances; if not
+        (or as long as the file does not exist), the size of the file is
+        checked at every update.
+
         Additional KWARGS inherited from PeriodicThreadedSystem:
         - interval: update interval in seconds
         - precise (bool): use the precise option in oclock.Timer
@@ -154,19 +331,48 @@ class PeriodicMeasurementsFromFile(PeriodicThreadedSystem):
         self.queue = Queue()
         super().__init__(**kwargs)
 
+    @property
+    def file(self):
+        return self.saved_data.path / self.saved_data.filename
+
+    def _file_modified(self):
+        """Cheap check of whether the file might contain new data."""
+        if self.file_event is None and FileWatcher.available():
+            # File did not exist yet when monitoring started
+            self.file_event = FileWatcher.register(self.file)
+        if self.file_event is not None:
+            if not self.file_event.is_set():
+                return False
+            self.file_event.clear()
+            return True
+        try:
+            size = self.file.stat().st_size
+        except FileNotFoundError:
+            return False
+        if size == self.file_size:
+            return False
+        self.file_size = size
+        return True
+
     def _update(self):
         """Must return data ready to put in queue."""
-        n = self.saved_data.number_of_measurements()
-        if n > self.n0:
-            self.saved_data.load(nrange=(self.n0 + 1, n))
-            if self.saved_data.data is not None:
-                measurement = self.saved_data.format_as_measurement()
-                self.queue.put(measurement)
-                self.n0 = n
+        if not self._file_modified():
+            return
+        self.saved_data.load_new()
+        if self.saved_data.data is not None:
+            measurement = self.saved_data.format_as_measurement()
+            self.queue.put(measurement)
 
     def _on_start(self):
         """Anything to do when system is started."""
-        if self.only_new:
-            self.n0 = self.saved_data.number_of_measurements()
-        else:
-            self.n0 = 0
+        self.saved_data.reset_new_data(skip_existing=self.only_new)
+        self.file_size = None
+        self.file_event = None
+        if FileWatcher.available():
+            self.file_event = FileWatcher.register(self.file)
+
+    def _on_stop(self):
+        """Anything to do when system is stopped."""
+        if self.file_event is not None:
+            FileWatcher.unregister(self.file, self.file_event)
+            self.file_event = None
@@ -19,8 +19,11 @@
 # along with the prevo python package.
 # If not, see <https://www.gnu.org/licenses/>
 
+import os
+import re
 import time
-from threading import Thread
+from collections import deque
+from threading import Thread, Event
 from random import random
 from queue import Queue, Empty
 from statistics import mean
@@ -29,38 +32,176 @@ from pathlib import Path
 import oclock
 import numpy as np
 
+try:
+    from PIL import Image
+except ModuleNotFoundError:
+    pass
+
 
 # ============================ Misc. queue management ========================
 
 
+def _is_fifo_queue(queue):
+    """True for queue.Queue objects, whose elements are in a deque.
+
+    (their content can then be taken at once under the queue's mutex)
+    """
+    return isinstance(getattr(queue, 'queue', None), deque) and hasattr(queue, 'mutex')
+
+
+def _clear_fifo_queue(queue):
+    """Empty a queue.Queue (mutex must be held), as get() calls would do.
+
+    As with get(), task accounting (unfinished_tasks) is left unchanged:
+    callers using queue.join() still call task_done() for each element.
+    """
+    queue.queue.clear()
+    queue.not_full.notify_all()
+
+
 def get_last_from_queue(queue):
     """Function to empty queue to get last element from it.
 
     Return None if queue is initially empty, return last element otherwise.
     """
+    try:
+        return queue.get_last()
+    except AttributeError:  # queue without get_last(), e.g. queue.Queue
+        pass
+
+    if _is_fifo_queue(queue):
+        # Empty queue at once with a single lock acquisition
+        with queue.mutex:
+            element = queue.queue[-1] if queue.queue else None
+            _clear_fifo_queue(queue)
+        return element
+
+    # Other queues (e.g. queue.SimpleQueue): take elements one by one
     element = None
     while True:
         try:
-            element = queue.get(timeout=0)
+            element = queue.get_nowait()
         except Empty:
             break
     return element
 
 
-def get_all_from_queue(queue):
+def get_all_from_queue(queue, max_elements=None):
     """Function to empty queue to get all elements from it as a list
 
-    Return None if queue is initially empty, return last element otherwise.
+    Return an empty list if queue is initially empty.
+    If max_elements is not None, take at most max_elements elements (the
+    oldest ones), the other ones staying in the queue.
     """
+    if max_elements is None:
+        try:
+            return queue.get_all()
+        except AttributeError:  # queue without get_all(), e.g. queue.Queue
+            pass
+
+    if _is_fifo_queue(queue):
+        # Take all elements at once with a single lock acquisition
+        with queue.mutex:
+            if max_elements is None or max_elements >= len(queue.queue):
+                elements = list(queue.queue)
+                _clear_fifo_queue(queue)
+            else:
+                elements = [queue.queue.popleft() for _ in range(max_elements)]
+                queue.not_full.notify_all()
+        return elements
+
+    # Other queues (e.g. queue.SimpleQueue): take elements one by one
     elements = []
-    while True:
+    while max_elements is None or len(elements) < max_elements:
         try:
-            elements.append(queue.get(timeout=0))
+            elements.append(queue.get_nowait())
         except Empty:
             break
     return elements
 
 
+class RingQueue:
+    """Bounded FIFO queue in which the oldest elements are dropped when full.
+
+    Based on collections.deque, whose append() and popleft() are atomic, so
+    that no lock or condition is involved when putting or getting elements
+    (contrary to queue.Queue). Suited for single producer/single consumer
+    transfer of data where only recent elements matter (e.g. live display).
+
+    Implements the subset of the queue.Queue API used with queues in prevo
+    (put, get, put_nowait, get_nowait, qsize, empty, full); put() never
+    blocks. Additional methods get_all() and get_last() empty the queue
+    without any lock, for consumers polling the queue periodically (e.g.
+    graphs); they are used by get_all_from_queue() / get_last_from_queue().
+    """
+
+    def __init__(self, maxsize=1000):
+        """Parameters:
+
+        - maxsize: max number of elements stored in the queue
+        """
+        self.maxsize = maxsize
+        self.queue = deque(maxlen=maxsize)
+        self.not_empty = Event()
+
+    def put(self, item, block=True, timeout=None):
+        """Put item in queue (block and timeout only for API compatibility)"""
+        self.queue.append(item)
+        if not self.not_empty.is_set():  # avoids taking the Event's lock
+            self.not_empty.set()
+
+    def put_nowait(self, item):
+        self.put(item)
+
+    def get(self, block=True, timeout=None):
+        """Remove and return oldest element from the queue.
+
+        Same behavior as queue.Queue.get() regarding block and timeout.
+        """
+        while True:
+            try:
+                return self.queue.popleft()
+            except IndexError:
+                if not block:
+                    raise Empty
+                self.not_empty.clear()
+                # element might have been put between popleft() and clear()
+                if self.queue:
+                    continue
+                if not self.not_empty.wait(timeout=timeout):
+                    raise Empty
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def get_all(self):
+        """Remove and return all elements in queue, as a list (non-blocking)"""
+        if not self.queue:
+            return []
+        self.not_empty.clear()
+        elements = []
+        popleft = self.queue.popleft
+        while True:
+            try:
+                elements.append(popleft())
+            except IndexError:
+                return elements
+
+    def get_last(self):
+        """Empty queue and return last element (None if empty, non-blocking)"""
+        elements = self.get_all()
+        return elements[-1] if elements else None
+
+    def qsize(self):
+        return len(self.queue)
+
+    def empty(self):
+        return not self.queue
+
+    def full(self):
+        return len(self.queue) == self.maxsize
+
+
 # ========================== Misc. file management ===========================
 
 
@@ -69,18 +210,51 @@ def increment_filename(file):
     that does not exist.
 
     Convenient for some uses, e.g. not overwrite metadata file, etc.
+    The increment is one more than the largest existing one, which is found
+    by listing the folder once (instead of testing names one by one).
+    """
+    file = Path(file)
+    pattern = re.compile(re.escape(file.stem) + r'-(\d+)' + re.escape(file.suffix))
+
+    n_max = 0
+    with os.scandir(file.absolute().parent) as entries:
+        for entry in entries:
+            match = pattern.fullmatch(entry.name)
+            if match:
+                n_max = max(n_max, int(match.group(1)))
+
+    return file.with_name(f'{file.stem}-{n_max + 1}{file.suffix}')
+
+
+# ============================ Misc. image tools =============================
+
+
+# Pillow modes of images as a function of data type and number of channels
+PIL_MODES = {
+    (np.dtype('uint8'), 1): 'L',
+    (np.dtype('uint8'), 3): 'RGB',
+    (np.dtype('uint8'), 4): 'RGBA',
+    (np.dtype('<u2'), 1): 'I;16',
+}
+
+
+def array_to_pil(img):
+    """Convert image array to a PIL Image, sharing its memory if possible.
+
+    Only 'L' and 'RGBA' (uint8) images are guaranteed to share memory with
+    the array (if it is contiguous); 'RGB' images are always copied, since
+    Pillow stores them with 4 bytes per pixel, and 'I;16' images may be
+    copied depending on the Pillow version. Non-contiguous arrays (e.g.
+    crops) are copied once, and arrays of types not in PIL_MODES are
+    converted with Image.fromarray().
     """
-    full_name_str = str(file.absolute())
-    success = False
-    n = 0
-    while not success:
-        n += 1
-        new_stem = f'{file.stem}-{n}'
-        new_name = full_name_str.replace(file.stem, new_stem)
-        new_file = Path(new_name)
-        if not new_file.exists():
-            success = True
-    return new_file
+    n_channels = 1 if img.ndim == 2 else img.shape[2]
+    mode = PIL_MODES.get((img.dtype, n_channels))
+    if mode is None:
+        return Image.fromarray(img)
+    img = np.ascontiguousarray(img)
+    height, width = img.shape[:2]
+    return Image.frombuffer(mode, (width, height), img, 'raw', mode, 0, 1)
 
 
 # =========================== Dataname management ============================
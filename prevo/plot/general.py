@@ -28,12 +28,11 @@ from threading import Event
 # Non standard imports
 import numpy as np
 import matplotlib.pyplot as plt
-from matplotlib.animation import FuncAnimation
 from matplotlib import cm
 import tzlocal
 
 # Local imports
-from ..misc import get_last_from_queue
+from ..misc import get_all_from_queue
 
 # The two lines below have been added following a console FutureWarning:
 # "Using an implicitly registered datetime converter for a matplotlib plotting
@@ -62,6 +61,49 @@ DISPOSITIONS = {
 local_timezone = tzlocal.get_localzone()
 
 
+def minmax_downsample(times, values, n_buckets):
+    """Reduce number of points to plot while keeping the visual envelope.
+
+    Data is split in n_buckets buckets of consecutive points, and only the
+    min and max values of every bucket are kept (with times of first and last
+    point of the bucket, respectively). Remaining points at the end that do
+    not fill a whole bucket are kept as is.
+
+    Parameters
+    ----------
+    - times: 1D array of times (length n)
+    - values: array of values, either 1D (length n) or 2D with one row per
+              channel sharing the same times (shape (n_channels, n)), in
+              which case all channels are reduced at once.
+    - n_buckets: number of buckets (e.g. width of axes in pixels)
+
+    Returns times, values (input arrays if no reduction is possible)
+    """
+    n = len(times)
+    bucket = n // max(int(n_buckets), 1)
+
+    if bucket <= 2:  # no reduction possible since 2 points kept per bucket
+        return times, values
+
+    m = n // bucket
+    k = m * bucket
+
+    blocks = values[..., :k].reshape(values.shape[:-1] + (m, bucket))
+
+    new_times = np.empty(2 * m + n - k, dtype=times.dtype)
+    new_values = np.empty(values.shape[:-1] + (2 * m + n - k,), dtype=values.dtype)
+
+    new_times[0:2 * m:2] = times[:k:bucket]
+    new_times[1:2 * m:2] = times[bucket - 1:k:bucket]
+    new_times[2 * m:] = times[k:]
+
+    blocks.min(axis=-1, out=new_values[..., 0:2 * m:2])
+    blocks.max(axis=-1, out=new_values[..., 1:2 * m:2])
+    new_values[..., 2 * m:] = values[..., k:]
+
+    return new_times, new_values
+
+
 class MeasurementFormatter:
     """Format lists, arrays etc. for plotting in matplotlib.
 
@@ -105,6 +147,14 @@ class MeasurementFormatter:
         """How to convert list array of times to a numpy array."""
         return np.concatenate(timelist)
 
+    @staticmethod
+    def values_to_block(values):
+        """How to stack values of all channels of an array measurement.
+
+        Returns a 2D numpy array of shape (number of channels, number of times)
+        """
+        return np.asarray(values, dtype=np.float64)
+
     # ============= Methods to convert unix times into datetimes =============
 
     @staticmethod
@@ -119,7 +169,7 @@ class MeasurementFormatter:
         Note: this is the fastest method, but the datetimes are in UTC format
               (not local time)
         """
-        return (np.array(unix_times) * 1e9).astype('datetime64[ns]')
+        return (np.asarray(unix_times) * 1e9).astype('datetime64[ns]')
 
     @staticmethod
     def to_datetime_pandas(unix_times):
@@ -134,9 +184,114 @@ class MeasurementFormatter:
         return pd.to_datetime(pd_times, utc=True).dt.tz_convert(local_timezone)
 
 
+class DataBuffer:
+    """Numpy buffers storing (unix) times and values of a sensor for plots.
+
+    Capacity is doubled each time it is exceeded, so that appending data
+    does not require re-creating arrays from the whole history.
+
+    If a maximum size is given, only the most recent data is kept (sliding
+    window): old data is discarded and the remaining data is moved back to
+    the beginning of the arrays when their end is reached, so that stored
+    data is always available as contiguous views (no copy).
+    """
+
+    def __init__(self, n_channels, capacity=1024, max_size=None):
+        """Parameters:
+
+        - n_channels: number of values (channels) per time
+        - capacity: initial number of times that can be stored
+        - max_size: max number of times kept in the buffer (None: no limit)
+        """
+        self.max_size = max_size
+        if max_size is not None:
+            capacity = min(capacity, 2 * max_size)
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty((n_channels, capacity), dtype=np.float64)
+        self.start = 0
+        self.stop = 0
+        self.count = 0  # total number of points appended since creation
+
+    def __len__(self):
+        return self.stop - self.start
+
+    @property
+    def capacity(self):
+        return len(self.times)
+
+    def _make_room(self, n):
+        """Discard data beyond max_size, and move or copy remaining data
+        at the beginning of (possibly larger) arrays to fit n new points."""
+        start, stop = self.start, self.stop
+        if self.max_size is not None:
+            start = max(start, stop + n - self.max_size)
+        size = stop - start
+
+        # Leaving as much free space as stored data allows amortized O(1)
+        # appends (for a sliding window, capacity stabilizes at 2 * max_size)
+        capacity = max(self.capacity, 2 * (size + n))
+
+        if capacity > self.capacity:
+            times = np.empty(capacity, dtype=self.times.dtype)
+            values = np.empty((len(self.values), capacity), dtype=self.values.dtype)
+        else:
+            times, values = self.times, self.values
+
+        times[:size] = self.times[start:stop]
+        values[:, :size] = self.values[:, start:stop]
+
+        self.times, self.values = times, values
+        self.start, self.stop = 0, size
+
+    def append(self, times, values):
+        """Add data at the end of the buffer.
+
+        Parameters
+        ----------
+        - times: 1D array of unix times, of length n
+        - values: 2D array of values, of shape (n_channels, n)
+        """
+        if self.max_size is not None and len(times) > self.max_size:
+            times = times[-self.max_size:]
+            values = values[:, -self.max_size:]
+
+        n = len(times)
+        if self.stop + n > self.capacity:
+            self._make_room(n)
+
+        n1 = self.stop
+        n2 = n1 + n
+        self.times[n1:n2] = times
+        self.values[:, n1:n2] = values
+        self.stop = n2
+        self.count += n
+
+        if self.max_size is not None:
+            self.start = max(self.start, n2 - self.max_size)
+
+    @property
+    def current_times(self):
+        """View of the times currently stored."""
+        return self.times[self.start:self.stop]
+
+    @property
+    def current_values(self):
+        """View of the values currently stored (channels, times)"""
+        return self.values[:, self.start:self.stop]
+
+
 class GraphBase(ABC):
     """Base class for managing plotting of arbitrary measurement data"""
 
+    # If False, UpdateGraph skips update() and drawing when no new measurement
+    # has arrived since last update (set to True for graphs that evolve with
+    # time even without new data, e.g. with traveling bars)
+    update_without_new_data = True
+
+    # Set to True (e.g. upon zoom or figure resizing) to have UpdateGraph
+    # update the graph at next step even if no new data has arrived
+    needs_refresh = False
+
     def __init__(
         self,
         names,
@@ -227,12 +382,21 @@ class GraphBase(ABC):
 
     @abstractmethod
     def update(self):
-        """How to update graph after adding measurements to it (graph.add())."""
+        """How to update graph after adding measurements to it (graph.add()).
+
+        Can return True if the whole figure needs to be redrawn (e.g. because
+        axes limits have changed), in which case blitting is not used for
+        this update.
+        """
         pass
 
     @property
     def animated_artists(self):
-        """Optional property to define for graphs updated with blitting."""
+        """Optional property to define for graphs updated with blitting.
+
+        (only these artists are redrawn at each update when blitting is used,
+        the rest of the figure being restored from a cached background)
+        """
         return ()
 
     # =========================== Static Plotting methods ===========================
@@ -245,6 +409,14 @@ class GraphBase(ABC):
             data = self.measurement_formatter.format_measurement(measurement)
             self.update_data(data)
 
+    def add_batch(self, measurements):
+        """Add several measurements at once (e.g. all those waiting in a queue)
+
+        Can be subclassed for more efficient storage of data by batches.
+        """
+        for measurement in measurements:
+            self.add(measurement)
+
     # ===================== Graph initialization methods =====================
 
     @property
@@ -342,7 +514,9 @@ class GraphBase(ABC):
         elif event.button == 1:                        # left click
             ax.axes.autoscale(False, axis='both')
         elif event.button == 3:                        # right click
+            ax.axes.relim()
             ax.axes.autoscale(True, axis='both')
+            event.canvas.draw_idle()
         else:
             pass
 
@@ -415,7 +589,7 @@ class GraphBase(ABC):
 
     def close(self):
         """Close matplotlib figure associated with graph"""
-        plt.close(self.graph.fig)
+        plt.close(self.fig)
 
 
 class UpdateGraph:
@@ -439,23 +613,63 @@ class UpdateGraph:
                          (won't be set or cleared, just monitored)
         - dt_graph: time interval to update the graph
         - blit: if True, use blitting to speed up the matplotlib animation
+                (ignored if the matplotlib backend does not support blitting)
         """
         self.graph = graph
         self.queues = queues
         self.dt_graph = dt_graph
-        self.blit = blit
+
+        self.fig = self.graph.fig
+        canvas = self.fig.canvas
+
+        self.blit = blit and getattr(canvas, 'supports_blit', True)
+        self.background = None
 
         self.external_stop = external_stop
         self.internal_stop = Event()
 
-        self.graph.fig.canvas.mpl_connect('close_event', self.on_fig_close)
+        canvas.mpl_connect('close_event', self.on_fig_close)
+
+        # Artists are created with the graph and do not change afterwards,
+        # so they are collected once here rather than at every refresh
+        self.animated_artists = tuple(self.graph.animated_artists)
+
+        if self.blit:
+            for artist in self.animated_artists:
+                artist.set_animated(True)
+            canvas.mpl_connect('draw_event', self.on_draw)
+            canvas.mpl_connect('resize_event', self.on_resize)
 
     def on_fig_close(self, event):
         """What to do when figure is closed."""
         self.stop()
 
-    def plot_new_data(self, i=0):
-        """define what to do at each loop of the matplotlib animation."""
+    def on_draw(self, event):
+        """Cache background (figure without animated artists) after full draws"""
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self.draw_animated_artists()
+
+    def on_resize(self, event):
+        """Cached background is invalid until the next full draw."""
+        self.background = None
+
+    def draw_animated_artists(self):
+        draw_artist = self.fig.draw_artist
+        for artist in self.animated_artists:
+            draw_artist(artist)
+
+    def refresh(self, full_redraw=False):
+        """Redraw whole figure or only animated artists (blitting)."""
+        canvas = self.fig.canvas
+        if full_redraw or not self.blit or self.background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(self.background)
+        self.draw_animated_artists()
+        canvas.blit(self.fig.bbox)
+
+    def plot_new_data(self):
+        """Define what to do at each update of the graph."""
 
         if self.internal_stop.is_set():
             return
@@ -463,32 +677,40 @@ class UpdateGraph:
         if self.external_stop and self.external_stop.is_set():
             self.stop()
             self.graph.close()
+            return
 
+        # All measurements received since last update are added at once,
+        # so that bursts of data result in a single update / draw
+        new_data = False
         for queue in self.queues:
-            measurement = get_last_from_queue(queue)
-            self.graph.add(measurement)
+            measurements = get_all_from_queue(queue)
+            if measurements:
+                self.graph.add_batch(measurements)
+                new_data = True
 
-        self.graph.update()
+        if not (new_data or self.graph.update_without_new_data or self.graph.needs_refresh):
+            return
 
-        if self.blit:
-            return self.graph.animated_artists
+        self.graph.needs_refresh = False
+        full_redraw = self.graph.update()
+        self.refresh(full_redraw=full_redraw)
 
     def run(self):
 
-        # Below, it doesn't work if there is no ani = before the FuncAnimation
-        ani = FuncAnimation(
-            fig=self.graph.fig,
-            func=self.plot_new_data,
-            interval=self.dt_graph * 1000,
-            cache_frame_data=False,
-            save_count=0,
-            blit=self.blit,
-        )
+        # Timer of the GUI event loop, so that graph updates are done in the
+        # main thread. Blitting is managed here (see refresh()) rather than
+        # with FuncAnimation, in order to redraw the full figure only when
+        # needed (e.g. change of axes limits).
+        self.timer = self.fig.canvas.new_timer(interval=int(self.dt_graph * 1000))
+        self.timer.add_callback(self.plot_new_data)
+        self.timer.start()
 
         plt.show(block=True)  # block=True allows the animation to work even
         # when matplotlib is in interactive mode (plt.ion()).
 
-        return ani
-
     def stop(self):
         self.internal_stop.set()
+        try:
+            self.timer.stop()
+        except AttributeError:  # run() not called
+            pass
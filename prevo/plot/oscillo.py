@@ -234,13 +234,10 @@ class OscilloGraph(GraphBase):
         data: data as output by format_measurement()
         stored_data: either self.current_data or self.previous_data.
         """
-        name = data['name']
-        time = data['time (unix)']
-        values = data['values']
-
-        stored_data[name]['times'].append(time)
-        for i, value in enumerate(values):
-            stored_data[name]['values'][i].append(value)
+        sensor_data = stored_data[data['name']]
+        sensor_data['times'].append(data['time (unix)'])
+        for channel_values, value in zip(sensor_data['values'], data['values']):
+            channel_values.append(value)
 
     def update_lines(self):
         """Update line positions with current data."""
@@ -252,6 +249,7 @@ class OscilloGraph(GraphBase):
             current_data = self.current_data[name]
 
             rel_times = []
+            datalist_to_array = self.datalist_to_array[name]
 
             # Avoids problems if no data stored yet
             prev_exists = bool(previous_data['times'])
@@ -282,11 +280,11 @@ class OscilloGraph(GraphBase):
                 vals = []
 
                 if curr_exists:
-                    curr_vals = self.datalist_to_array[name](curr_values)
+                    curr_vals = datalist_to_array(curr_values)
                     vals.append(curr_vals)
 
                 if prev_exists:
-                    prev_vals = self.datalist_to_array[name](prev_values)
+                    prev_vals = datalist_to_array(prev_values)
                     vals.append(prev_vals[prev_condition])
 
                 values_array = np.concatenate(vals)
@@ -20,11 +20,15 @@
 # If not, see <https://www.gnu.org/licenses/>
 
 
+import warnings
+
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
 
-from .general import GraphBase, MeasurementFormatter
-from .general import DISPOSITIONS, local_timezone
+import numpy as np
+
+from .general import GraphBase, MeasurementFormatter, DataBuffer
+from .general import DISPOSITIONS, local_timezone, minmax_downsample
 
 
 # =============================== Main classes ===============================
@@ -32,6 +36,15 @@ from .general import DISPOSITIONS, local_timezone
 
 class NumericalGraph(GraphBase):
 
+    # Margin (fraction of data range) left around data when rescaling axes
+    autoscale_margin = 0.1
+
+    # Nothing changes on the graph if no new data arrives
+    update_without_new_data = False
+
+    # Unix time origin in matplotlib date units
+    unix_epoch = mdates.date2num(np.datetime64('1970-01-01T00:00:00'))
+
     def __init__(self,
                  names,
                  data_types,
@@ -42,7 +55,8 @@ class NumericalGraph(GraphBase):
                  linestyle='.',
                  data_as_array=False,
                  time_conversion='numpy',
-                 measurement_formatter=MeasurementFormatter()):
+                 measurement_formatter=MeasurementFormatter(),
+                 max_stored_points=None):
         """Initiate figures and axes for data plot as a function of asked types.
 
         Input
@@ -68,10 +82,24 @@ class NumericalGraph(GraphBase):
         - data_as_array: if sensors return arrays of values for different times
                          instead of values for a single time, put this
                          bool as True (default False)
-        - time_conversion: how to convert from unix time to datetime for arrays;
-                           possible values: 'numpy', 'pandas'.
+        - time_conversion: DEPRECATED, ignored (times are converted to
+                           numpy datetimes when plotted); passing a value
+                           other than 'numpy' raises a DeprecationWarning.
         - measurement_formatter: MeasurementFormatter (or subclass) object.
+        - max_stored_points: max number of points kept in memory (and
+                             plotted) for each sensor; when exceeded, the
+                             oldest data is discarded (sliding window).
+                             If None (default), all data is kept.
         """
+        if time_conversion != 'numpy':
+            warnings.warn(
+                'time_conversion is ignored by NumericalGraph and will be '
+                'removed in a future version',
+                DeprecationWarning,
+                stacklevel=2,
+            )
+
+        self.max_stored_points = max_stored_points
         super().__init__(names=names,
                          data_types=data_types,
                          fig=fig,
@@ -83,6 +111,18 @@ class NumericalGraph(GraphBase):
                          time_conversion=time_conversion,
                          measurement_formatter=measurement_formatter)
 
+        # Data is downsampled to the pixel resolution of axes before plotting
+        self._axes_widths = None
+        self.fig.canvas.mpl_connect('resize_event', self.on_resize)
+
+        # When zooming / panning, only the visible data is downsampled
+        for ax in self.axs.values():
+            ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+        # To only update lines of sensors that have received new data
+        self.plotted_counts = {}
+        self.line_limits = {}
+
     # ================== Methods subclassed from GraphBase ===================
 
     def create_axes(self):
@@ -115,23 +155,63 @@ class NumericalGraph(GraphBase):
         self.formatter = {}
         for ax in self.axs.values():
             self.locator[ax] = mdates.AutoDateLocator(tz=local_timezone)
-            self.formatter[ax] = mdates.ConciseDateFormatter(self.locator,
+            self.formatter[ax] = mdates.ConciseDateFormatter(self.locator[ax],
                                                              tz=local_timezone)
+            # Use Concise Date Formatting for minimal space used on screen by time
+            ax.xaxis.set_major_locator(self.locator[ax])
+            ax.xaxis.set_major_formatter(self.formatter[ax])
 
     def update_data(self, data):
-        """Store measurement time and values in active data lists."""
-
-        name = data['name']
-        values = data['values']
-        time = self.time_converters[name](data['time (unix)'])
-
-        self.current_data[name]['times'].append(time)
-        for i, value in enumerate(values):
-            self.current_data[name]['values'][i].append(value)
+        """Store measurement time and values in data buffers."""
+        self.update_data_batch(name=data['name'], batch=(data,))
+
+    def add_batch(self, measurements):
+        """Add several measurements with a single buffer append per sensor."""
+        format_measurement = self.measurement_formatter.format_measurement
+        batches = {}
+        for measurement in measurements:
+            if measurement is not None:
+                data = format_measurement(measurement)
+                batches.setdefault(data['name'], []).append(data)
+        for name, batch in batches.items():
+            self.update_data_batch(name=name, batch=batch)
+
+    def update_data_batch(self, name, batch):
+        """Store times and values of several measurements of the same sensor.
+
+        Parameters
+        ----------
+        - name: name of sensor
+        - batch: iterable of data (output of format_measurement())
+        """
+        formatter = self.measurement_formatter
+
+        if self.data_as_array[name]:
+            unix_times = np.concatenate([data['time (unix)'] for data in batch])
+            values = np.concatenate(
+                [formatter.values_to_block(data['values']) for data in batch],
+                axis=1,
+            )
+        else:
+            unix_times = np.array([data['time (unix)'] for data in batch])
+            values = np.array([data['values'] for data in batch], dtype=np.float64).T
+
+        # Conversion to datetimes is done in update_lines() on plotted data
+        self.current_data[name].append(unix_times, values)
+
+    def create_empty_data(self):
+        """Data is stored in numpy buffers (one per sensor)"""
+        return {
+            name: DataBuffer(
+                n_channels=len(self.data_types[name]),
+                max_size=self.max_stored_points,
+            )
+            for name in self.names
+        }
 
     def update(self):
         self.update_lines()
-        self.update_time_formatting()
+        return self.update_axes_limits()
 
     @property
     def animated_artists(self):
@@ -139,30 +219,144 @@ class NumericalGraph(GraphBase):
 
     # ======================== Local update methods ==========================
 
-
     def update_lines(self):
-        """Update line positions with current data."""
+        """Update line positions with current data.
 
-        for name in self.names:
+        Lines of sensors that have not received data since the last update
+        are left untouched (avoids invalidating their cached paths).
 
-            lines = self.lines[name]
-            current_data = self.current_data[name]
+        Also stores the limits of plotted data for each axes in
+        self.data_limits as [tmin, tmax, vmin, vmax] (unix times for t)
+        """
+        for name in self.names:
 
-            if current_data['times']:  # Avoids problems if no data stored yet
+            data_buffer = self.current_data[name]
 
-                times = self.timelist_to_array[name](current_data['times'])
+            if not data_buffer:  # Avoids problems if no data stored yet
+                continue
 
-                for line, curr_values in zip(lines,
-                                             current_data['values']):
+            if self.plotted_counts.get(name) == data_buffer.count:
+                continue
+            self.plotted_counts[name] = data_buffer.count
 
-                    values = self.datalist_to_array[name](curr_values)
-                    line.set_data(times, values)
+            lines = self.lines[name]
+            times, values = self.visible_data(data_buffer, lines)
+
+            # All channels of a sensor share times, so that downsampling and
+            # time conversion are done once per sensor, not once per line
+            n_pixels = max(self.axes_widths[line.axes] for line in lines)
+            plot_times, plot_values = minmax_downsample(times, values, n_pixels)
+            datetimes = self.measurement_formatter.to_datetime_numpy(plot_times)
+
+            for line, values in zip(lines, plot_values):
+                line.set_data(datetimes, values)
+                self.line_limits[line] = self.get_limits(plot_times, values)
+
+        self.data_limits = {
+            ax: [np.inf, -np.inf, np.inf, -np.inf] for ax in self.axs.values()
+        }
+        for line, (tmin, tmax, vmin, vmax) in self.line_limits.items():
+            limits = self.data_limits[line.axes]
+            limits[0] = min(limits[0], tmin)
+            limits[1] = max(limits[1], tmax)
+            limits[2] = min(limits[2], vmin)
+            limits[3] = max(limits[3], vmax)
+
+    def visible_data(self, data_buffer, lines):
+        """Times and values of data visible in axes of lines.
+
+        All data is returned if any of the axes is autoscaled in x;
+        otherwise (zoom, pan), only data within the x limits (and the points
+        just outside) are returned, to be downsampled at full resolution.
+        """
+        times = data_buffer.current_times
+        values = data_buffer.current_values
+
+        axs = {line.axes for line in lines}
+        if any(ax.get_autoscalex_on() for ax in axs):
+            return times, values
+
+        xmin = min(ax.get_xlim()[0] for ax in axs)
+        xmax = max(ax.get_xlim()[1] for ax in axs)
+        tmin, tmax = (np.array([xmin, xmax]) - self.unix_epoch) * 86400
+
+        i1 = max(np.searchsorted(times, tmin) - 1, 0)
+        i2 = np.searchsorted(times, tmax, side='right') + 1
+        return times[i1:i2], values[:, i1:i2]
+
+    def on_xlim_changed(self, ax):
+        if not ax.get_autoscalex_on():  # i.e. zoom / pan
+            self.plotted_counts = {}  # to re-calculate downsampling of lines
+            self.needs_refresh = True  # even if no new data arrives
+
+    @staticmethod
+    def get_limits(times, values):
+        """Return tmin, tmax, vmin, vmax of data, ignoring non-finite values."""
+        if not times.size:
+            return np.inf, -np.inf, np.inf, -np.inf
+        finite_values = values[np.isfinite(values)]
+        if finite_values.size:
+            vmin, vmax = finite_values.min(), finite_values.max()
+        else:
+            vmin, vmax = np.inf, -np.inf
+        return times.min(), times.max(), vmin, vmax
 
-    def update_time_formatting(self):
-        """Use Concise Date Formatting for minimal space used on screen by time"""
-        for ax in self.axs.values():
-            ax.xaxis.set_major_locator(self.locator[ax])
-            ax.xaxis.set_major_formatter(self.formatter[ax])
-            # Lines below are needed for autoscaling to work
-            ax.relim()
-            ax.autoscale_view(tight=True, scalex=True, scaley=True)
+    @property
+    def axes_widths(self):
+        """Width of axes in pixels (cached, updated when figure is resized)"""
+        if self._axes_widths is None:
+            self._axes_widths = {ax: ax.bbox.width for ax in self.axs.values()}
+        return self._axes_widths
+
+    def on_resize(self, event):
+        self._axes_widths = None
+        self.plotted_counts = {}  # to re-calculate downsampling of all lines
+        self.needs_refresh = True  # even if no new data arrives
+
+    def update_axes_limits(self):
+        """Rescale axes (if autoscale is active) when needed.
+
+        To avoid re-drawing the whole figure at every update, new limits
+        leave a margin (autoscale_margin) around data, and axes are only
+        rescaled when data goes out of limits or when data uses a much smaller
+        range than the current limits.
+
+        Returns True if limits have changed (figure needs to be redrawn).
+        """
+        rescaled = False
+        to_datetime = self.measurement_formatter.to_datetime_numpy
+
+        for ax, (tmin, tmax, vmin, vmax) in self.data_limits.items():
+
+            if tmin <= tmax and ax.get_autoscalex_on():
+                xmin, xmax = mdates.date2num(to_datetime([tmin, tmax]))
+                if self.limits_need_update(ax.get_xlim(), xmin, xmax):
+                    new_lims = self.padded_limits(xmin, xmax, default_pad=1 / 86400)
+                    ax.set_xlim(*new_lims, auto=None)
+                    rescaled = True
+
+            if vmin <= vmax and ax.get_autoscaley_on():
+                if self.limits_need_update(ax.get_ylim(), vmin, vmax):
+                    default_pad = abs(vmax) * self.autoscale_margin or 1
+                    new_lims = self.padded_limits(vmin, vmax, default_pad=default_pad)
+                    ax.set_ylim(*new_lims, auto=None)
+                    rescaled = True
+
+        return rescaled
+
+    def limits_need_update(self, limits, dmin, dmax):
+        """Check if data range (dmin, dmax) requires change of axes limits."""
+        lmin, lmax = limits
+        if dmin < lmin or dmax > lmax:
+            return True
+        span = dmax - dmin
+        return span > 0 and (lmax - lmin) > (1 + 4 * self.autoscale_margin) * span
+
+    def padded_limits(self, dmin, dmax, default_pad):
+        """New axes limits for data range (dmin, dmax) with margins on both sides.
+
+        default_pad is used when dmin = dmax.
+        """
+        span = dmax - dmin
+        pad = self.autoscale_margin * span if span > 0 else default_pad
+        return dmin - pad, dmax + pad
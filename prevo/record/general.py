@@ -25,10 +25,15 @@ from abc import ABC, abstractmethod
 from datetime import datetime
 from pathlib import Path
 from threading import Event, Thread
-from queue import Queue, Empty
+from queue import Empty
 from traceback import print_exc
 import os
 
+try:
+    from queue import SimpleQueue
+except ImportError:  # Python < 3.7
+    from queue import Queue as SimpleQueue
+
 # Non-standard imports
 from tqdm import tqdm
 import oclock
@@ -36,7 +41,7 @@ from clivo import CommandLineInterface, ControlledProperty, ControlledEvent
 
 # Local imports
 from ..control import RecordingControl
-from ..misc import mode_to_names
+from ..misc import mode_to_names, get_all_from_queue, RingQueue
 
 # ================================ MISC Tools ================================
 
@@ -165,6 +170,17 @@ class RecordingBase(ABC):
     # Warnings when queue size goes over some limits
     queue_warning_limits = 1e1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9
 
+    # Max number of measurements waiting to be plotted (oldest are dropped)
+    plotting_queue_size = 1000
+
+    # Buffer size (bytes) of data file, which is written to the OS only when
+    # the buffer is full or when the file is closed (every dt_save)
+    file_buffer_size = 2**20
+
+    # Max number of measurements taken at once from the saving queue (the
+    # saving timer and stop event are checked between batches)
+    saving_batch_size = 64
+
     def __init__(
         self,
         Sensor,
@@ -236,8 +252,8 @@ class RecordingBase(ABC):
 
         # Queues in which data is put (NEED to be defined before self.saving)
         self.queues = {
-            'saving': Queue(),
-            'plotting': Queue(),
+            'saving': SimpleQueue(),  # put() cheaper than in Queue()
+            'plotting': RingQueue(maxsize=self.plotting_queue_size),
         }
         # Events that need to be set to put data in each data queue
         self.queue_events = {
@@ -428,6 +444,38 @@ class RecordingBase(ABC):
         """
         pass
 
+    def measurement_for_queue(self, measurement, queue_name):
+        """Measurement object to put in the queue named queue_name.
+
+        By default, the same measurement object goes to all queues.
+        (Optional)
+        """
+        return measurement
+
+    def flush(self, file):
+        """Write to file any data that save() keeps in memory.
+
+        Called at every saving cycle, just before file is closed.
+        (Optional)
+        """
+        pass
+
+    def before_saving(self):
+        """Define what to do when the data saving thread starts.
+
+        (Optional)
+        """
+        pass
+
+    def after_saving(self):
+        """Define what to do when the data saving thread stops.
+
+        Called after all data remaining in the saving queue has been saved,
+        or if saving has failed.
+        (Optional)
+        """
+        pass
+
     # General methods and attributes (can be subclassed if necessary) --------
 
     def print_info_on_failed_reading(self, status):
@@ -447,14 +495,22 @@ class RecordingBase(ABC):
         """
         failed_reading = False  # True temporarily if reading fails
 
+        # Queues and events do not change during recording
+        queues_and_events = tuple(
+            (name, queue, self.queue_events[name])
+            for name, queue in self.queues.items()
+        )
+
         # Without this here, the first data points are irregularly spaced.
         self.timer.reset()
 
         while not self.internal_stop.is_set():
 
             if not self.active:
-                if not self.continuous:
-                    # to avoid checking too frequently if active or not.
+                # to avoid checking too frequently if active or not.
+                if self.continuous:
+                    self.internal_stop.wait(self.timer.interval)
+                else:
                     self.timer.checkpt()
                 continue
 
@@ -477,9 +533,9 @@ class RecordingBase(ABC):
                 measurement = self.format_measurement(data)
                 self.after_measurement()
 
-                for queue, event in zip(self.queues.values(), self.queue_events.values()):
+                for name, queue, event in queues_and_events:
                     if event.is_set():
-                        queue.put(measurement)
+                        queue.put(self.measurement_for_queue(measurement, name))
 
             # Below, this means that one does not try to acquire data right
             # away after a fail, but one waits for the usual time interval
@@ -520,9 +576,43 @@ class RecordingBase(ABC):
             print(f'Impossible saving {measurement} for {self.name}; '
                   'will be missing from data')
 
+    def _try_flush(self, file, attempts=3):
+        """Try writing lines buffered in file manager. If not, keep them.
+
+        (for file managers with a line buffer, e.g. CsvFile; lines that
+        could not be written stay in the buffer for the next flush)
+        """
+        for attempt in range(attempts):
+            try:
+                self.file_manager._flush_buffer(file)
+            except Exception as e:
+                print(f'Error writing buffered data for {self.name}: {e}. '
+                      f'Attempt {attempt + 1}/{attempts}')
+            else:
+                return
+        print(f'Impossible writing buffered data for {self.name}; '
+              'will try again at next flush')
+
     @try_func
     def data_save(self):
         """Save data that is stored in a queue by data_read."""
+        self.before_saving()
+        try:
+            self._data_save()
+        finally:
+            self.after_saving()
+
+    def _open_data_file(self):
+        """Open data file for appending data (with large write buffer)"""
+        return open(
+            self.file_manager.file,
+            'a',
+            encoding='utf8',
+            buffering=self.file_buffer_size,
+        )
+
+    def _data_save(self):
+        """Saving data from queue, see data_save()"""
 
         saving_queue = self.queues['saving']
         saving_timer = oclock.Timer(interval=self.dt_save)
@@ -533,7 +623,7 @@ class RecordingBase(ABC):
 
             # Open and close file at each cycle to be able to save periodically
             # and for other users/programs to access the data simultaneously
-            with open(self.file_manager.file, 'a', encoding='utf8') as file:
+            with self._open_data_file() as file:
 
                 # Get all data from saving queue as long as the current
                 # iteration of the timer is still active.
@@ -551,12 +641,22 @@ class RecordingBase(ABC):
                     except Empty:
                         pass
                     else:
-                        if measurement is not None:
-                            self._try_save(measurement, file)
+                        # Also take measurements already waiting in queue
+                        # at once, instead of one get() (lock) per measurement
+                        measurements = get_all_from_queue(
+                            saving_queue,
+                            max_elements=self.saving_batch_size - 1,
+                        )
+                        measurements.insert(0, measurement)
+                        for measurement in measurements:
+                            if measurement is not None:
+                                self._try_save(measurement, file)
 
                     if self.internal_stop.is_set():  # Move to buffering waitbar
                         break
 
+                self.flush(file)
+
             # periodic check whether there is data to save
             # This is outside of the with statement in order to close the
             # file as soon as possible when not in use.
@@ -574,16 +674,19 @@ class RecordingBase(ABC):
         # loosing too much data if there is an error.
 
         with tqdm(total=saving_queue.qsize()) as pbar:
-            while True:
-                try:
-                    with open(self.file_manager.file, 'a', encoding='utf8') as file:
-                        saving_timer.reset()
-                        while not saving_timer.interval_exceeded:
+            queue_empty = False
+            while not queue_empty:
+                with self._open_data_file() as file:
+                    saving_timer.reset()
+                    while not saving_timer.interval_exceeded:
+                        try:
                             measurement = saving_queue.get(timeout=self.dt_save)
-                            self._try_save(measurement, file)
-                            pbar.update()
-                except Empty:
-                    break
+                        except Empty:
+                            queue_empty = True
+                            break
+                        self._try_save(measurement, file)
+                        pbar.update()
+                    self.flush(file)
 
         print(f'Data buffer saving finished for {self.name}')
 
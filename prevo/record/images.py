@@ -20,6 +20,15 @@
 # If not, see <https://www.gnu.org/licenses/>
 
 
+# Standard library imports
+import os
+from collections import deque
+from pathlib import Path
+from queue import Queue
+from threading import Thread
+
+# Non-standard imports
+import numpy as np
 import gittools
 import prevo
 
@@ -29,13 +38,32 @@ from ..csv import CsvFile
 from ..viewers import CvWindow, CvViewer
 from ..viewers import TkWindow, TkViewer
 from ..viewers import MplWindow, MplViewer
-from ..misc import increment_filename
+from ..misc import increment_filename, array_to_pil
 
 # Optional, nonstandard
 try:
-    from PIL import Image
+    import tifffile
 except ModuleNotFoundError:
-    pass
+    tifffile_available = False
+else:
+    tifffile_available = True
+
+try:
+    import cv2
+except ModuleNotFoundError:
+    cv2_available = False
+else:
+    cv2_available = True
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB, TJPF_GRAY
+    from turbojpeg import TJSAMP_444, TJSAMP_422, TJSAMP_420, TJSAMP_GRAY
+except ModuleNotFoundError:
+    turbojpeg_available = False
+else:
+    turbojpeg_available = True
+    # Chroma subsampling options (see ImageRecording._jpeg_subsampling())
+    turbojpeg_subsamplings = {'444': TJSAMP_444, '422': TJSAMP_422, '420': TJSAMP_420}
 
 
 Windows = {
@@ -54,6 +82,13 @@ Viewers = {
 class ImageRecording(RecordingBase):
     """Recording class to record images and associated timestamps."""
 
+    # Viewers only display the most recent image: no need to keep more in
+    # memory if display is slower than acquisition.
+    plotting_queue_size = 10
+
+    # Timestamps are written to file by batches of (at most) this size
+    timestamp_batch_size = 64
+
     def __init__(
         self,
         Sensor,
@@ -63,9 +98,12 @@ class ImageRecording(RecordingBase):
         extension=None,
         ndigits=5,
         quality=None,
+        save_kwargs=None,
         column_names=None,
         column_formats=None,
         csv_separator='\t',
+        image_saving_threads=None,
+        copy_images=False,
         **kwargs,
     ):
         """Init ImageRecording object.
@@ -80,12 +118,37 @@ class ImageRecording(RecordingBase):
                       default, creates a folder with the name of the sensor
                       in the 'path' directory defined above.
         - extension: e.g. '.tif', '.jpg', etc. of the saved images (None: default)
+                     Use '.npy' to save raw arrays with numpy (no encoding
+                     at all, fastest but largest files).
         - ndigits: number of digits for the image counter in the filename
         - quality: for compressed image formats (e.g. jpg, tif), see
         https://pillow.readthedocs.io/en/stable/handbook/image-file-formats.html
+        - save_kwargs: dict of options passed to Pillow when saving images
+                       (see link above). If None, use options favoring
+                       speed (see default_save_kwargs).
+
+        NOTE: images are saved with Pillow, except if the following
+        (optional) packages are installed and can honor all save_kwargs:
+        - tifffile for .tif images (if no save_kwargs, e.g. no quality)
+        - PyTurboJPEG (and libjpeg-turbo) for .jpg images (save_kwargs
+          quality, subsampling, and optimize=False)
+        - opencv-python for 8-bit .png images (save_kwargs compress_level)
+          and for 8-bit .jpg images if PyTurboJPEG is not available
+          (save_kwargs quality, subsampling, optimize)
         - column_names: iterable of str (name of columns in csv file)
         - column_formats: iterable of str (optional, str formatting)
         - csv_separator: character to separate columns in CSV file.
+        - image_saving_threads: number of threads in which images are
+                                encoded and written to files, in parallel
+                                with data saving (timestamps). If None,
+                                use up to 4 threads depending on the number
+                                of CPUs. If 0 (or if save() is called
+                                outside of data_save()), images are saved
+                                directly in the calling thread.
+        - copy_images: if True, images are copied right after being read
+                       from the sensor (into a pool of reused arrays), for
+                       sensors that return arrays in which the next images
+                       are written (e.g. views of camera SDK buffers).
 
         Additional kwargs from RecordingBase:
         - dt: time interval between readings (default 1s).
@@ -128,9 +191,12 @@ class ImageRecording(RecordingBase):
             csv_separator=csv_separator,
         )
 
-        self.image_path = self.path / Sensor.name if image_path is None else image_path
+        self.image_path = self.path / Sensor.name if image_path is None else Path(image_path)
         self.image_path.mkdir(exist_ok=True)
 
+        # Image files are str paths (no pathlib.Path construction per image)
+        self.image_folder = str(self.image_path) + os.sep
+
         self.column_names = column_names
 
         if extension is None:
@@ -140,19 +206,95 @@ class ImageRecording(RecordingBase):
             self.extension = extension
 
         self.quality = quality
+
+        if save_kwargs is None:
+            self.save_kwargs = self.default_save_kwargs()
+        else:
+            self.save_kwargs = dict(save_kwargs)
+        if quality is not None:
+            self.save_kwargs.setdefault('quality', quality)
         self.ndigits = ndigits
-        self.fmt = f'0{self.ndigits}'
+        self.image_prefix = f'{self.name}-'
+
+        self._write_image = self._get_image_writer()
+
+        if image_saving_threads is None:
+            self.image_saving_threads = min(4, os.cpu_count() or 1)
+        else:
+            self.image_saving_threads = image_saving_threads
+
+        # Arrays (already allocated) in which images can be copied; they are
+        # put back in the pool after the image has been saved.
+        self.copy_images = copy_images
+        self._free_arrays = deque(maxlen=9 * self.image_saving_threads + 1)
+
+        # Image saving threads (only running during data saving, see
+        # before_saving()), their queue, and images in the order they
+        # were queued, with their saving status
+        self._image_saving_queue = Queue(maxsize=8 * self.image_saving_threads)
+        self._image_saving_pool = []
+        self._pending_timestamps = deque()
 
         # number of images already recorded when record is called
         # (e.g. due to previous recording interrupted and restared)
-        # The with open creates the file if not exists yet.
-        with open(self.file_manager.file, 'a', encoding='utf8'):
-            n_lines = self.file_manager.number_of_lines()
-        self.num = n_lines - 1 if n_lines > 1 else 0
+        self.file_manager.file.touch(exist_ok=True)
+        self.num = self._get_number_of_recorded_images()
+
+    def _get_number_of_recorded_images(self):
+        """Number of images already listed in timestamp file.
+
+        Deduced from the image number on the last line if possible, to avoid
+        reading the whole file.
+        """
+        try:
+            index = self.column_names.index('num')
+        except (AttributeError, ValueError):
+            index = None
+
+        if index is not None:
+            last_line = self.file_manager.last_line()
+            if last_line is None:
+                return 0
+            try:
+                return int(last_line.split(self.file_manager.csv_separator)[index]) + 1
+            except (IndexError, ValueError):  # e.g. last line is column titles
+                pass
+
+        n_lines = self.file_manager.number_of_lines()
+        return n_lines - 1 if n_lines > 1 else 0
 
     def format_measurement(self, data):
         """How to format the data"""
-        return {'name': self.name, 'num': self.num, **data}
+        measurement = {'name': self.name, 'num': self.num, **data}
+        if self.copy_images:
+            measurement['image'] = self._copy_image(measurement['image'])
+        return measurement
+
+    def _copy_image(self, img):
+        """Copy image into an array of the pool (or a new one if none fits)"""
+        try:
+            array = self._free_arrays.pop()
+        except IndexError:
+            array = None
+        if array is None or array.shape != img.shape or array.dtype != img.dtype:
+            array = np.empty_like(img)
+        np.copyto(array, img)
+        return array
+
+    def measurement_for_queue(self, measurement, queue_name):
+        """Queues other than saving get their own copy of pooled images.
+
+        Pooled arrays are reused as soon as the image is saved, so that
+        e.g. viewers would otherwise display images being overwritten.
+        """
+        if self.copy_images and queue_name != 'saving':
+            return {**measurement, 'image': measurement['image'].copy()}
+        return measurement
+
+    def _release_image(self, measurement):
+        """Put array of image back in the pool once image is saved"""
+        if self.copy_images:
+            self._free_arrays.append(measurement['image'])
 
     def after_measurement(self):
         """What to do after formatting data."""
@@ -160,23 +302,164 @@ class ImageRecording(RecordingBase):
 
     def _generate_image_filename(self, measurement):
         """How to name images. Can be subclassed."""
-        basename = f"{self.name}-{measurement['num']:{self.fmt}}"
-        return basename + self.extension
+        number = str(measurement['num']).zfill(self.ndigits)
+        return self.image_prefix + number + self.extension
 
-    def _save_image(self, measurement, file):
-        """How to save images to individual files. Can be subclassed."""
-        img = measurement['image']
-        if self.quality is None:
-            Image.fromarray(img).save(file)
+    def _get_image_writer(self):
+        """Choose fastest available method to write images to files.
+
+        Pillow is used if other methods cannot honor all options in
+        save_kwargs.
+        """
+        extension = self.extension.lower()
+        options = set(self.save_kwargs)
+
+        if extension == '.npy':
+            return self._write_image_numpy
+
+        if extension in ('.tif', '.tiff') and tifffile_available:
+            if not options:
+                return self._write_image_tifffile
+
+        if extension in ('.jpg', '.jpeg'):
+
+            jpeg_options_ok = (
+                options <= {'quality', 'subsampling', 'optimize'}
+                and self._jpeg_subsampling() is not None
+            )
+
+            if turbojpeg_available and jpeg_options_ok and not self.save_kwargs.get('optimize'):
+                try:
+                    self._jpeg = TurboJPEG()
+                except RuntimeError:  # libjpeg-turbo library not found
+                    pass
+                else:
+                    return self._write_image_turbojpeg
+
+            # (sampling factor option only in recent OpenCV versions)
+            if cv2_available and jpeg_options_ok and hasattr(cv2, 'IMWRITE_JPEG_SAMPLING_FACTOR'):
+                return self._write_image_opencv
+
+        if extension == '.png' and cv2_available and options <= {'compress_level'}:
+            return self._write_image_opencv
+
+        return self._write_image_pil
+
+    # Pillow values of jpeg subsampling, and corresponding chroma subsampling
+    jpeg_subsamplings = {
+        0: '444', '4:4:4': '444',
+        1: '422', '4:2:2': '422',
+        2: '420', '4:2:0': '420',
+    }
+
+    def _jpeg_subsampling(self):
+        """Jpeg chroma subsampling ('444', '422', '420') from save_kwargs.
+
+        Default is 4:2:0 as in Pillow; None if value not supported.
+        """
+        return self.jpeg_subsamplings.get(self.save_kwargs.get('subsampling', 2))
+
+    def default_save_kwargs(self):
+        """Pillow saving options used if save_kwargs is not specified.
+
+        Favor speed: no / little compression for png (Pillow default
+        compress_level is 6, which is slow), no chroma subsampling nor
+        optimization pass for jpg.
+        """
+        extension = self.extension.lower()
+        if extension == '.png':
+            return {'compress_level': 0 if self.continuous else 1}
+        if extension in ('.jpg', '.jpeg'):
+            return {'subsampling': 0, 'optimize': False}
+        return {}
+
+    def _write_image_pil(self, img, file):
+        array_to_pil(img).save(file, **self.save_kwargs)
+
+    # OpenCV color conversions (images are RGB, OpenCV works with BGR)
+    cv2_conversions = {3: 'COLOR_RGB2BGR', 4: 'COLOR_RGBA2BGRA'}
+
+    def _write_image_opencv(self, img, file):
+        n_channels = 1 if img.ndim == 2 else img.shape[2]
+        if img.dtype != np.uint8 or n_channels not in (1, 3, 4):
+            return self._write_image_pil(img, file)
+
+        if n_channels > 1:
+            conversion = getattr(cv2, self.cv2_conversions[n_channels])
+            img = cv2.cvtColor(img, conversion)
+
+        # Default values are those of Pillow
+        if self.extension.lower() == '.png':
+            compress_level = self.save_kwargs.get('compress_level', 6)
+            params = [cv2.IMWRITE_PNG_COMPRESSION, compress_level]
         else:
-            Image.fromarray(img).save(file, quality=self.quality)
+            sampling = 'IMWRITE_JPEG_SAMPLING_FACTOR_' + self._jpeg_subsampling()
+            params = [
+                cv2.IMWRITE_JPEG_QUALITY, self.save_kwargs.get('quality', 75),
+                cv2.IMWRITE_JPEG_SAMPLING_FACTOR, getattr(cv2, sampling),
+                cv2.IMWRITE_JPEG_OPTIMIZE, int(bool(self.save_kwargs.get('optimize'))),
+            ]
+
+        # imencode instead of imwrite to support non-ASCII paths on Windows
+        success, data = cv2.imencode(self.extension, img, params)
+        if not success:
+            raise RuntimeError(f'OpenCV could not encode {file}')
+        with open(file, 'wb') as f:
+            f.write(data)
+
+    def _write_image_numpy(self, img, file):
+        with open(file, 'wb') as f:  # (np.save() would change some extensions)
+            np.save(f, img, allow_pickle=False)
+
+    def _write_image_tifffile(self, img, file):
+        photometric = 'minisblack' if img.ndim < 3 else 'rgb'
+        tifffile.imwrite(file, img, photometric=photometric)
+
+    def _write_image_turbojpeg(self, img, file):
+        quality = self.save_kwargs.get('quality', 75)  # as in Pillow
+        if img.ndim < 3:
+            data = self._jpeg.encode(
+                img[:, :, None],
+                quality=quality,
+                pixel_format=TJPF_GRAY,
+                jpeg_subsample=TJSAMP_GRAY,
+            )
+        else:
+            data = self._jpeg.encode(
+                img,
+                quality=quality,
+                pixel_format=TJPF_RGB,
+                jpeg_subsample=turbojpeg_subsamplings[self._jpeg_subsampling()],
+            )
+        with open(file, 'wb') as f:
+            f.write(data)
 
-    def _save_timestamp(self, measurement, file):
+    def _save_image(self, measurement, file):
+        """How to save images to individual files. Can be subclassed.
+
+        NOTE: file is the full path of the image file as a str, not as a
+        pathlib.Path object (to avoid creating a Path for every image);
+        this is also the case for the file argument of the _write_image_*
+        methods. Subclasses needing Path methods can use Path(file).
+        """
+        self._write_image(measurement['image'], file)
+
+    def _save_timestamp(self, measurement, filename, file):
         """How to save timestamps and other info to (opened) timestamp file"""
-        filename = self._generate_image_filename(measurement)
-        info = {'filename': filename, **measurement}
-        data = [info[x] for x in self.column_names]
-        self.file_manager._write_line(data, file)
+        data = [
+            filename if column == 'filename' else measurement[column]
+            for column in self.column_names
+        ]
+        # Writing errors are managed separately (see _try_flush()) so that
+        # the line is not buffered again if save() is called again
+        self.file_manager._buffer_line(data)
+        if len(self.file_manager.buffer) >= self.timestamp_batch_size:
+            self._try_flush(file)
+
+    def flush(self, file):
+        """Write timestamps remaining in buffer at the end of saving cycle"""
+        self._save_pending_timestamps(file)
+        self._try_flush(file)
 
     def save(self, measurement, file):
         """Write data to .tsv file with format: datetime / delta_t / value(s).
@@ -187,8 +470,81 @@ class ImageRecording(RecordingBase):
         - file: file in which to save the data
         """
         img_filename = self._generate_image_filename(measurement)
-        self._save_image(measurement, file=self.image_path / img_filename)
-        self._save_timestamp(measurement, file=file)
+        img_file = self.image_folder + img_filename
+        if self._image_saving_pool:
+            # Timestamp is written only once image is saved (see below)
+            pending = {'measurement': measurement, 'filename': img_filename, 'saved': None}
+            self._pending_timestamps.append(pending)
+            # Blocks if image saving threads do not keep up (backpressure)
+            self._image_saving_queue.put((pending, img_file))
+            self._save_pending_timestamps(file)
+        else:
+            self._save_image(measurement, file=img_file)
+            self._save_timestamp(measurement, filename=img_filename, file=file)
+            self._release_image(measurement)
+
+    # =============== Image saving in parallel threads (pool) ================
+
+    def before_saving(self):
+        """Start threads that save images put in queue by save()"""
+        for _ in range(self.image_saving_threads):
+            thread = Thread(target=self._save_images_from_queue, daemon=True)
+            thread.start()
+            self._image_saving_pool.append(thread)
+
+    def after_saving(self):
+        """Wait for all images in queue to be saved and stop threads."""
+        for _ in self._image_saving_pool:
+            self._image_saving_queue.put(None)
+        for thread in self._image_saving_pool:
+            thread.join()
+        self._image_saving_pool.clear()
+        # Timestamps of images saved after the last saving cycle
+        if self._pending_timestamps:
+            with self._open_data_file() as file:
+                self.flush(file)
+
+    def _save_images_from_queue(self):
+        while True:
+            item = self._image_saving_queue.get()
+            if item is None:
+                break
+            pending, file = item
+            measurement = pending['measurement']
+            pending['saved'] = self._try_save_image(measurement, file)
+            self._release_image(measurement)
+
+    def _save_pending_timestamps(self, file):
+        """Save timestamps of images whose saving is finished, in order.
+
+        Images that could not be saved do not appear in the timestamp file.
+        """
+        pending_timestamps = self._pending_timestamps
+        while pending_timestamps and pending_timestamps[0]['saved'] is not None:
+            pending = pending_timestamps.popleft()
+            if pending['saved']:
+                self._save_timestamp(
+                    pending['measurement'],
+                    filename=pending['filename'],
+                    file=file,
+                )
+
+    def _try_save_image(self, measurement, file, attempts=3):
+        """Try saving image. If not, ignore.
+
+        Returns True if image was saved, False otherwise.
+        """
+        for attempt in range(attempts):
+            try:
+                self._save_image(measurement, file=file)
+            except Exception as e:
+                print(f'Error saving {os.path.basename(file)} for {self.name}: {e}. '
+                      f'Attempt {attempt + 1}/{attempts}')
+            else:
+                return True
+        print(f'Impossible saving {os.path.basename(file)} for {self.name}; '
+              'will be missing from data')
+        return False
 
     @property
     def info(self):
@@ -244,10 +600,11 @@ class ImageRecord(Record):
 
     def get_image_recordings(self):
         """Useful when combined with other recording types (e.g. vacuum)"""
-        self.image_recordings = {}
-        for name, recording in self.recordings.items():
-            if issubclass(recording.__class__, ImageRecording):
-                self.image_recordings[name] = recording
+        self.image_recordings = {
+            name: recording
+            for name, recording in self.recordings.items()
+            if isinstance(recording, ImageRecording)
+        }
 
     def _save_metadata(self, filename):
         """To be able to call save_metadata() with arbitrary filenames"""
@@ -266,6 +623,7 @@ class ImageRecord(Record):
                 'extension': recording.extension,
                 'digit number': recording.ndigits,
                 'quality': str(recording.quality),
+                'save options': str(recording.save_kwargs),
                 **recording.info,
             }
 
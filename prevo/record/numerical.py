@@ -21,6 +21,7 @@
 
 
 # Non-standard imports
+import numpy as np
 import gittools
 import prevo
 
@@ -34,6 +35,9 @@ from ..misc import increment_filename
 class NumericalRecording(RecordingBase):
     """Recording class that saves numerical sensor data to csv files."""
 
+    # Lines are written to file by batches of (at most) this size
+    line_batch_size = 256
+
     def __init__(
         self,
         Sensor,
@@ -131,9 +135,36 @@ class NumericalRecording(RecordingBase):
         Can be redefined in subclasses.
         NOTE: if measurement is None, Record.data_save() does not save the data
         """
-        time_info = (measurement['time (unix)'], measurement['dt (s)'])
-        value_info = measurement['values']
-        self.file_manager._write_line(time_info + value_info, file=file)
+        values = measurement['values']
+        if isinstance(values, np.ndarray):
+            values = values.tolist()  # Python floats are formatted faster
+        data = (measurement['time (unix)'], measurement['dt (s)'], *values)
+        # Writing errors are managed separately (see _try_flush()) so that
+        # the line is not buffered again if save() is called again
+        self.file_manager._buffer_line(data)
+        if len(self.file_manager.buffer) >= self.line_batch_size:
+            self._try_flush(file)
+
+    def flush(self, file):
+        """Write lines remaining in buffer at the end of saving cycle"""
+        self._try_flush(file)
+
+    def after_saving(self):
+        """Write lines still buffered, e.g. if saving has failed.
+
+        Lines that cannot be written are dropped, and their number printed.
+        """
+        buffer = self.file_manager.buffer
+        if not buffer:
+            return
+        try:
+            with self._open_data_file() as file:
+                self._try_flush(file)
+        finally:
+            if buffer:
+                print(f'WARNING: {len(buffer)} lines of data could not be '
+                      f'saved for {self.name} and are lost')
+                buffer.clear()
 
 
 class NumericalRecord(Record):
@@ -149,6 +180,8 @@ class NumericalRecord(Record):
         graph_legends=None,
         graph_colors=None,
         graph_linestyle='.',
+        graph_blit=True,
+        graph_max_points=None,
         dirty_ok=True,
         **kwargs,
     ):
@@ -169,6 +202,12 @@ class NumericalRecord(Record):
         - graph_legends: dict of graph legends for numerical graph
                          (see prevo.plot)
         - graph_linestyle: linestyle of data on numerical graph (e.g. '.-')
+        - graph_blit: if True (default), only redraw lines when updating the
+                      numerical graph (blitting), the rest of the figure
+                      being redrawn only when needed (e.g. axes rescaling).
+        - graph_max_points: max number of points per sensor kept in the
+                            numerical graph (oldest points are discarded);
+                            if None (default), keep all points.
         - dirty_ok: if False, record cannot be started if git repositories are
                     not clean (commited).
 
@@ -191,16 +230,19 @@ class NumericalRecord(Record):
         self.graph_legends = graph_legends
         self.graph_colors = graph_colors
         self.graph_linestyle = graph_linestyle
+        self.graph_blit = graph_blit
+        self.graph_max_points = graph_max_points
 
         self.dirty_ok = dirty_ok
         self.get_numerical_recordings()
 
     def get_numerical_recordings(self):
         """Useful when vacuum combined with other recording types (e.g. camrec)"""
-        self.numerical_recordings = {}
-        for name, recording in self.recordings.items():
-            if issubclass(recording.__class__, NumericalRecording):
-                self.numerical_recordings[name] = recording
+        self.numerical_recordings = {
+            name: recording
+            for name, recording in self.recordings.items()
+            if isinstance(recording, NumericalRecording)
+        }
 
     def _save_metadata(self, filename):
         """To call save_metadata() with custom filenames"""
@@ -236,6 +278,7 @@ class NumericalRecord(Record):
             colors=self.graph_colors,
             linestyle=self.graph_linestyle,
             data_as_array=False,
+            max_stored_points=self.graph_max_points,
         )
 
         # In case the queue contains other measurements than numerical
@@ -249,4 +292,5 @@ class NumericalRecord(Record):
             queues=numerical_queues,
             external_stop=self.internal_stop,
             dt_graph=self.dt_graph,
+            blit=self.graph_blit,
         )
@@ -22,14 +22,16 @@
 
 
 from abc import ABC, abstractmethod
+import heapq
+import itertools
 import time
-from queue import Queue
-from threading import Thread, Event
+from threading import Thread, Event, Condition, current_thread
 from traceback import print_exc
 
 import numpy as np
 
-from ..misc import get_all_from_queue, get_last_from_queue
+from ..misc import get_all_from_queue, get_last_from_queue, RingQueue
+from ..misc import _is_fifo_queue
 
 
 # ========================== Appearance Parameters  ==========================
@@ -64,15 +66,38 @@ def max_possible_pixel_value(img):
     Output
     ------
     vmax: max pixel value (int or float or None)
+          (1.0 for float images with values within [0, 1], None for other
+          float images, i.e. automatic scaling)
     """
-    if img.dtype == 'uint8':
-        return 2**8 - 1
-    elif img.dtype == 'uint16':
-        return 2**16 - 1
+    if img.dtype.kind in 'ui':
+        return np.iinfo(img.dtype).max
+    elif img.dtype.kind == 'f' and img.max() <= 1:
+        return 1.0
     else:
         return None
 
 
+def _drain_take_last(queue):
+    """Empty image queue and return its last element (None if empty).
+
+    queue.Queue objects are emptied with a single lock acquisition, and
+    the drained elements are marked as done (the viewer is the only
+    consumer of its image queue and does not call task_done()).
+    Other queues are emptied with get_last_from_queue().
+    """
+    if not _is_fifo_queue(queue):
+        return get_last_from_queue(queue)
+    with queue.mutex:
+        elements = queue.queue
+        last = elements[-1] if elements else None
+        queue.unfinished_tasks = max(0, queue.unfinished_tasks - len(elements))
+        elements.clear()
+        if not queue.unfinished_tasks:
+            queue.all_tasks_done.notify_all()
+        queue.not_full.notify_all()
+    return last
+
+
 class InfoSender(ABC):
     """Class to send information to display in Image Viewer.
 
@@ -88,10 +113,11 @@ class InfoSender(ABC):
         Parameters
         ----------
 
-        - queue: queue into information is put
+        - queue: queue into information is put (if not specified, a
+                 lock-free queue keeping only the latest info is used)
         - dt_check: how often (in seconds) information is sent
         """
-        self.queue = Queue() if queue is None else queue
+        self.queue = RingQueue(maxsize=1) if queue is None else queue
         self.internal_stop = Event()
         self.dt_check = dt_check
 
@@ -115,13 +141,85 @@ class InfoSender(ABC):
             self.internal_stop.wait(self.dt_check)
 
     def start(self):
-        """Same as _run() but nonblocking."""
-        Thread(target=self._run).start()
+        """Same as _run() but nonblocking.
+
+        (info is sent from a thread shared by all info senders)
+        """
+        info_scheduler.add(self)
 
     def stop(self):
         self.internal_stop.set()
 
 
+class InfoScheduler:
+    """Send information periodically for many InfoSenders from one thread.
+
+    Senders are kept in a heap sorted by the time of their next update;
+    the thread is started when needed and ends when there are no senders
+    left (stopped senders are removed at their next scheduled update).
+    """
+
+    def __init__(self):
+        self.senders = []  # heap of (time of next update, id, sender)
+        self.ids = itertools.count()  # to avoid comparing senders in heap
+        self.condition = Condition()
+        self.thread = None
+
+    def add(self, sender):
+        with self.condition:
+            self._schedule(sender, time.monotonic())
+            if self.thread is None:
+                self.thread = Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+
+    def _schedule(self, sender, t):
+        heapq.heappush(self.senders, (t, next(self.ids), sender))
+
+    def _next_sender(self):
+        """Wait until next update is due and return corresponding sender.
+
+        Returns None (and marks the thread as finished) if no senders left.
+        """
+        with self.condition:
+            while self.senders:
+                t, _, sender = self.senders[0]
+                if sender.internal_stop.is_set():
+                    heapq.heappop(self.senders)
+                    continue
+                remaining = t - time.monotonic()
+                if remaining > 0:
+                    self.condition.wait(remaining)
+                    continue
+                heapq.heappop(self.senders)
+                return sender
+            self.thread = None
+
+    def _run(self):
+        try:
+            while True:
+                sender = self._next_sender()
+                if sender is None:
+                    return
+                # An error in a sender must not stop info for other senders
+                try:
+                    info = sender._generate_info()
+                    sender.queue.put(info)
+                except Exception:
+                    print_exc()
+                # same timing as InfoSender._run()
+                with self.condition:
+                    self._schedule(sender, time.monotonic() + sender.dt_check)
+        finally:
+            # so that add() starts a new thread if this one ends unexpectedly
+            with self.condition:
+                if self.thread is current_thread():
+                    self.thread = None
+
+
+info_scheduler = InfoScheduler()
+
+
 class LiveFpsCalculator(InfoSender):
     """"Calculate fps in real time from a queue supplying image times.
 
@@ -146,10 +244,10 @@ class LiveFpsCalculator(InfoSender):
     def _generate_info(self):
         """Calculate fps from display times, print '...' if none available"""
         times = get_all_from_queue(self.time_queue)
-        if times:
-            if len(times) > 1:
-                fps = 1 / np.diff(times).mean()
-                return f'[{fps:.1f} fps]'
+        if len(times) > 1:
+            # (same as 1 / mean of time differences, without intermediates)
+            fps = (len(times) - 1) / (times[-1] - times[0])
+            return f'[{fps:.1f} fps]'
         return '[... fps]'
 
 
@@ -276,10 +374,17 @@ class WindowBase:
 
         # store times at which images are shown on screen (e.g. for fps calc.)
         if self.calculate_fps:
-            self.display_times = []             # to calculate fps on all times
+            # to calculate average fps, only number of images and first/last
+            # display times are needed
+            self.display_number = 0
+            self.first_display_time = None
+            self.last_display_time = None
+
+        # Queues below are lock-free deques (only used between the display
+        # loop and the info threads, and only recent values matter)
 
         if self.show_fps:
-            self.display_times_queue = Queue()  # to calculate fps on partial data
+            self.display_times_queue = RingQueue()  # fps on partial data
             fps_calculator = LiveFpsCalculator(time_queue=self.display_times_queue,
                                                dt_check=kwargs.get('dt_fps'))
             self.info_queues['fps'] = fps_calculator.queue
@@ -288,7 +393,7 @@ class WindowBase:
             fps_calculator.start()
 
         if self.show_num:
-            self.image_number_queue = Queue()
+            self.image_number_queue = RingQueue(maxsize=1)
             image_number = LiveImageNumber(num_queue=self.image_number_queue,
                                            dt_check=kwargs.get('dt_num'))
             self.info_queues['num'] = image_number.queue
@@ -299,7 +404,10 @@ class WindowBase:
     def _store_display_times(self):
         t = time.perf_counter()
         if self.calculate_fps:
-            self.display_times.append(t)
+            if self.first_display_time is None:
+                self.first_display_time = t
+            self.last_display_time = t
+            self.display_number += 1
         if self.show_fps:
             self.display_times_queue.put(t)
 
@@ -326,6 +434,9 @@ class WindowBase:
 
         Returns None if no new info to print on screen.
         """
+        if not self.info_queues:
+            return
+
         update = False
         for name, queue in self.info_queues.items():
             info = get_last_from_queue(queue)
@@ -351,7 +462,7 @@ class WindowBase:
 
     def _update_image(self):
         """How to process measurement from the image queue"""
-        data = get_last_from_queue(self.image_queue)
+        data = _drain_take_last(self.image_queue)
         if data is not None:
 
             self.image = self.measurement_formatter.get_image(data)
@@ -378,8 +489,9 @@ class WindowBase:
             info_sender.stop()
 
         if self.calculate_fps:
-            if len(self.display_times) > 1:
-                fps = 1 / np.diff(self.display_times).mean()
+            if self.display_number > 1:
+                dt = self.last_display_time - self.first_display_time
+                fps = (self.display_number - 1) / dt
                 print(f'Average display frame rate [{self.name}]: {fps:.3f} fps. ')
             else:
                 print('Impossible to calculate average FPS (not enough values). ')
@@ -31,6 +31,11 @@ from .general import WindowBase, ViewerBase, CONFIG, DISPOSITIONS
 class MplWindow(WindowBase):
     """Display camera images using Matplotlib"""
 
+    # Interpolation used by imshow: 'none' avoids matplotlib's (costly)
+    # antialiasing resampling pass at each frame; use e.g. 'antialiased'
+    # for smoother display of large images at the expense of speed.
+    interpolation = 'none'
+
     def __init__(
         self,
         image_queue,
@@ -99,6 +104,7 @@ class MplWindow(WindowBase):
             animated=True,
             vmin=0,
             vmax=max_possible_pixel_value(image),
+            interpolation=self.interpolation,
             **kwargs,
         )
         self.init_done = True
@@ -126,7 +132,7 @@ class MplWindow(WindowBase):
         if not self.init_done:
             self._init_image(self.image)
         else:
-            self.im.set_array(self.image)
+            self.im.set_data(self.image)
 
 
 class MplViewer(ViewerBase):
@@ -195,12 +201,17 @@ class MplViewer(ViewerBase):
             to_be_animated += window._update(i=i)
         return to_be_animated
 
+    @property
+    def interval(self):
+        """Interval (in ms, at least 1) between animation frames"""
+        return max(1, round(self.dt_graph * 1000))
+
     def _run(self):
         """Main function to run the animation"""
         self.ani = FuncAnimation(
             self.fig,
             self._update,
-            interval=int(self.dt_graph) * 1000,
+            interval=self.interval,
             blit=self.blit,
             cache_frame_data=False,
         )
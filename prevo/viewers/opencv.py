@@ -36,6 +36,7 @@ class CvWindow(WindowBase):
         self,
         image_queue,
         name,
+        input_is_bgr=False,
         **kwargs,
     ):
         """Init Window object.
@@ -45,6 +46,9 @@ class CvWindow(WindowBase):
 
         - image_queue: queue in which taken images are put.
         - name: NOT optional here because it serves as ID for openCV windows
+        - input_is_bgr: if True, color images in the queue are assumed to be
+                        already in BGR order (e.g. from OpenCV capture) and
+                        are displayed without RGB -> BGR conversion.
 
         Additional kwargs from WindowBase:
         - calculate_fps: if True, store image times fo calculate fps
@@ -58,6 +62,7 @@ class CvWindow(WindowBase):
                                  queue into image arrays and image numbers
                                  (type MeasurementFormatter or equivalent)
         """
+        self.input_is_bgr = input_is_bgr
         super().__init__(image_queue, name=name, **kwargs)
 
     def _init_window(self):
@@ -69,12 +74,14 @@ class CvWindow(WindowBase):
         # Here we need to have the info display directly in display_image
         # since the info is written directly on the image itself
         # This can cause some imprecisions in the image numbers displayed
-        cv2.putText(self.image, self.info, (50, 50), cv2.FONT_HERSHEY_SIMPLEX,
-                    1, (255, 255, 255), 2, cv2.LINE_AA)
-
-        if self.image.ndim > 2:
+        if self.image.ndim > 2 and not self.input_is_bgr:
             # openCV works with BGR data
             self.image = cv2.cvtColor(self.image, cv2.COLOR_RGB2BGR)
+
+        if self.info_queues:  # no info to write if no fps, num etc.
+            cv2.putText(self.image, self.info, (50, 50), cv2.FONT_HERSHEY_SIMPLEX,
+                        1, (255, 255, 255), 2, cv2.LINE_AA)
+
         cv2.imshow(self.name, self.image)
 
 
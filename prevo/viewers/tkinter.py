@@ -23,9 +23,22 @@
 
 import tkinter as tk
 import itertools
+import time
 from PIL import Image, ImageTk
 
+try:
+    import cv2
+except ModuleNotFoundError:
+    cv2_available = False
+else:
+    cv2_available = True
+
 from .general import WindowBase, ViewerBase, CONFIG, DISPOSITIONS
+from ..misc import array_to_pil
+
+
+# Image.Resampling only exists in recent Pillow versions
+Resampling = getattr(Image, 'Resampling', Image)
 
 
 class TkWindow(WindowBase):
@@ -35,6 +48,7 @@ class TkWindow(WindowBase):
         self,
         image_queue,
         auto_size=True,
+        resize_mode='quality',
         **kwargs,
     ):
         """Init TkSingleViewer object
@@ -44,6 +58,9 @@ class TkWindow(WindowBase):
 
         - image_queue: queue in which taken images are put.
         - auto_size: autoscale image to window in real time
+        - resize_mode: 'quality' (smooth interpolation) or 'fast' (nearest
+                       pixel) for resizing images to window; 'fast' is
+                       always used while the window is being resized.
 
         Additional kwargs from WindowBase:
         - name: optional name for display purposes.
@@ -60,6 +77,7 @@ class TkWindow(WindowBase):
         """
         super().__init__(image_queue, **kwargs)
         self.auto_size = auto_size
+        self.resize_mode = resize_mode
 
     @property
     def parent(self):
@@ -96,39 +114,86 @@ class TkWindow(WindowBase):
             )
             self.info_label.pack(expand=True)
 
-        self.image_count = 0
+        self.image_shape = None  # (height, width) of last received image
+        self.img_properties = None
+
+        self.resizing_until = 0
+        self.parent.bind('<Configure>', self._on_configure, add='+')
+
+    # time (s) after last window resizing event during which fast resizing
+    # of images is used (quality resizing is resumed afterwards)
+    resizing_delay = 0.1
+
+    def _on_configure(self, event):
+        """Called when window is resized (or moved)."""
+        self.resizing_until = time.monotonic() + self.resizing_delay
 
     def _display_info(self):
         self.info_label.config(text=self.info)
 
     def _display_image(self):
         """How to display image in viewer."""
-        self.image_count += 1
-
-        img = Image.fromarray(self.image)
-        img_disp = self._prepare_displayed_image(img)
-
-        self.img = ImageTk.PhotoImage(image=img_disp)
-        self.image_label.configure(image=self.img)
+        img_disp = self._prepare_displayed_image(self.image)
+        if not isinstance(img_disp, Image.Image):
+            img_disp = array_to_pil(img_disp)
+
+        # Re-use existing Tk photo image if possible (avoids allocating a
+        # new Tk image every frame); re-create only if size/mode changes
+        img_properties = img_disp.size, img_disp.mode
+        if img_properties == self.img_properties:
+            self.img.paste(img_disp)
+        else:
+            self.img = ImageTk.PhotoImage(image=img_disp)
+            self.image_label.configure(image=self.img)
+            self.img_properties = img_properties
 
     def _prepare_displayed_image(self, img):
-        """Resize image and/or calculate aspect ratio if necessary"""
-
-        if self.image_count > 1:
-            if self.auto_size:
-                dimensions = self._adapt_image_to_window()
-                try:
-                    img_disp = img.resize(dimensions, Image.LANCZOS)
-                except ValueError:  # somtimes dimensions are (0, 0) for some reason
-                    img_disp = img
-            else:
-                img_disp = img
+        """Resize image and/or calculate aspect ratio if necessary
 
-        else:  # Calculate aspect ratio on first image received
-            self.aspect_ratio = img.height / img.width
-            img_disp = img
+        img is an image array; returns image array or PIL Image.
+        """
+        height, width = img.shape[:2]
+
+        # Calculate aspect ratio on first image received (or if image changes
+        # size); the image is displayed as is in this case
+        if (height, width) != self.image_shape:
+            self.image_shape = height, width
+            self.aspect_ratio = height / width
+            return img
+
+        if not self.auto_size:
+            return img
+
+        dimensions = self._adapt_image_to_window()
+        # Sometimes dimensions are (0, 0) for some reason; also,
+        # no need to resample if window has the size of the image
+        if min(dimensions) > 0 and dimensions != (width, height):
+            return self._resize_image(img, dimensions)
+        return img
+
+    def _resize_image(self, img, dimensions):
+        """Resize image array to dimensions (width, height).
+
+        Uses OpenCV if available (faster), Pillow otherwise or if OpenCV
+        does not support the image type.
+        """
+        fast = (self.resize_mode == 'fast' or time.monotonic() < self.resizing_until)
+
+        if cv2_available:
+            if fast:
+                interpolation = cv2.INTER_NEAREST
+            # INTER_AREA avoids aliasing when reducing size (like LANCZOS)
+            elif dimensions[0] < img.shape[1]:
+                interpolation = cv2.INTER_AREA
+            else:
+                interpolation = cv2.INTER_LINEAR
+            try:
+                return cv2.resize(img, dimensions, interpolation=interpolation)
+            except cv2.error:
+                pass
 
-        return img_disp
+        resample = Resampling.NEAREST if fast else Resampling.LANCZOS
+        return array_to_pil(img).resize(dimensions, resample)
 
     def _adapt_image_to_window(self):
         """Calculate new dimensions of image to accommodate window resizing."""
@@ -224,10 +289,16 @@ class TkViewer(ViewerBase):
         self.root.mainloop()
 
     def _update(self):
+        t0 = time.perf_counter()
         self._update_info()
         self._update_images()
         self._check_external_stop()
-        self.loop = self.root.after(int(1000 * self.dt_graph), self._update)
+        if self.internal_stop.is_set():  # root destroyed, do not reschedule
+            return
+        # Time spent updating is subtracted so that updates happen every
+        # dt_graph (and not every dt_graph + update time)
+        dt = self.dt_graph - (time.perf_counter() - t0)
+        self.loop = self.root.after(max(1, int(1000 * dt)), self._update)
 
     def _cancel_loop(self):
         try:
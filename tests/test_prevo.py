@@ -5,13 +5,23 @@
 
 # Standard library
 from pathlib import Path
+from queue import Queue
 
 # Non standard
+import numpy as np
 import pytest
 
 # local imports
 import prevo
-from prevo.measurements import SavedCsvData
+from prevo.csv import CsvFile
+from prevo.measurements import SavedCsvData, FileWatcher
+from prevo.measurements import PeriodicMeasurementsFromFile
+from prevo.misc import RingQueue, get_all_from_queue, get_last_from_queue
+from prevo.misc import increment_filename
+from prevo.plot.general import DataBuffer, minmax_downsample
+from prevo.record import SensorBase
+from prevo.record.images import ImageRecording
+from prevo.record.numerical import NumericalRecording
 
 
 datafolder = Path(prevo.__file__).parent / '..' / 'data/manip'
@@ -62,3 +72,309 @@ def test_load_partial(name):
     sdata.load(nrange)  # test partial loading of data
     assert len(sdata.data) == nrange[1] - nrange[0] + 1
     assert tuple(sdata.data.loc[nred - 1].round(decimals=4)) == lines[name]
+
+
+@pytest.mark.parametrize('dt_graph', (0.01, 0.02, 0.04, 0.1))
+def test_mpl_viewer_interval(dt_graph):  # animation interval in ms
+    from prevo.viewers import MplViewer
+    viewer = MplViewer(windows=(), dt_graph=dt_graph)
+    assert viewer.interval == round(dt_graph * 1000)
+
+
+@pytest.mark.parametrize('time_conversion', ('pandas', 'datetime'))
+def test_numerical_graph_time_conversion(time_conversion):  # deprecated
+    from prevo.plot import NumericalGraph
+    with pytest.warns(DeprecationWarning):
+        NumericalGraph(names=('P',), data_types={'P': ('P (Pa)',)},
+                       time_conversion=time_conversion)
+
+
+# ============================ Live loading of data ===========================
+
+
+def write_lines(file, lines):
+    with open(file, 'a', encoding='utf8') as f:
+        f.write(''.join(lines))
+
+
+@pytest.mark.parametrize('skip_existing', (False, True))
+def test_load_new(tmp_path, skip_existing):  # only data added since last call
+    file = tmp_path / 'data.tsv'
+    write_lines(file, ['t\tx\n', '1\t10\n', '2\t20\n'])
+    sdata = SavedCsvData('X', 'data.tsv', tmp_path)
+    sdata.reset_new_data(skip_existing=skip_existing)
+    sdata.load_new()
+    if skip_existing:
+        assert sdata.data is None
+    else:
+        assert list(sdata.data['x']) == [10, 20]
+    write_lines(file, ['3\t30\n', '4\t4'])  # last line incomplete
+    sdata.load_new()
+    assert list(sdata.data.columns) == ['t', 'x']
+    assert list(sdata.data['x']) == [30]
+    write_lines(file, ['0\n'])
+    sdata.load_new()
+    assert list(sdata.data['x']) == [40]
+    sdata.load_new()
+    assert sdata.data is None
+
+
+class FloatCsvData(SavedCsvData):
+    def _read_csv(self, file, **kwargs):
+        return super()._read_csv(file, dtype=float, **kwargs)
+
+
+def test_read_csv_subclass(tmp_path):  # same parsing in load() and load_new()
+    file = tmp_path / 'data.tsv'
+    write_lines(file, ['t\tx\n', '1\t10\n'])
+    sdata = FloatCsvData('X', 'data.tsv', tmp_path)
+    sdata.load()
+    assert sdata.data['x'].dtype == float
+    sdata.reset_new_data(skip_existing=True)
+    write_lines(file, ['2\t20\n'])
+    sdata.load_new()
+    assert sdata.data['x'].dtype == float
+    assert list(sdata.data['x']) == [20]
+
+
+def test_monitor_file_not_existing_yet(tmp_path):  # e.g. before recording
+    path = tmp_path / 'folder'  # folder does not exist yet either
+    sdata = SavedCsvData('X', 'data.tsv', path)
+    monitor = PeriodicMeasurementsFromFile(sdata, interval=0.01)
+    monitor.start()
+    try:
+        path.mkdir()
+        write_lines(path / 'data.tsv', ['time (unix)\tdt (s)\tx\n', '1\t0\t10\n'])
+        measurement = monitor.queue.get(timeout=5)
+    finally:
+        monitor.stop()
+    assert list(measurement['values'][0]) == [10]
+    assert not FileWatcher._watches and FileWatcher._observer is None
+
+
+@pytest.mark.parametrize('skip_existing', (False, True))
+def test_load_new_empty_file(tmp_path, skip_existing):  # header not written yet
+    file = tmp_path / 'data.tsv'
+    file.touch()
+    sdata = SavedCsvData('X', 'data.tsv', tmp_path)
+    sdata.reset_new_data(skip_existing=skip_existing)
+    sdata.load_new()
+    assert sdata.data is None
+    write_lines(file, ['t\tx\n', '1\t10\n'])
+    sdata.load_new()
+    assert list(sdata.data['x']) == [10]
+
+
+# ================================= CSV files =================================
+
+
+def test_number_of_lines(tmp_path):
+    csv_file = CsvFile('data.tsv', path=tmp_path)
+    write_lines(csv_file.file, ['t\tx\n', '1\t10\n', '2\t20\n'])
+    assert csv_file.number_of_lines() == 3
+    write_lines(csv_file.file, ['3\t3'])  # incomplete line
+    assert csv_file.number_of_lines() == 4
+    # data file (large enough to be read by several blocks)
+    csv_file = CsvFile(filenames['P'], path=datafolder)
+    assert csv_file.number_of_lines() == meas_numbers['P'] + 1
+
+
+def test_last_line(tmp_path):
+    csv_file = CsvFile('data.tsv', path=tmp_path)
+    write_lines(csv_file.file, ['t\tx\n', '1\t10\n', '2\t20\n'])
+    assert csv_file.last_line() == '2\t20'
+    write_lines(csv_file.file, ['3\t3'])  # incomplete line
+    assert csv_file.last_line() == '2\t20'
+    # data file (large enough to be read by several blocks backwards)
+    csv_file = CsvFile(filenames['P'], path=datafolder)
+    last_values = csv_file.last_line().split('\t')
+    assert len(last_values) == len(lines['P'])
+
+
+def test_last_line_no_complete_line(tmp_path):
+    csv_file = CsvFile('data.tsv', path=tmp_path)
+    csv_file.file.touch()
+    assert csv_file.last_line() is None
+    write_lines(csv_file.file, ['t\tx'])
+    assert csv_file.last_line() is None
+
+
+formats = [
+    ('.3f', '.2f', ''),
+    ('', '8.2e', '+.1f'),
+    ('.4g', '05.1f', 'G'),
+    ('d', '>6', '.2%'),  # not printf-compatible (str.format used)
+]
+
+values = [
+    (1616490450.5062, 2727.25, 0.1),
+    (-3, 1e20, float('nan')),
+    (np.float64(0.125), np.int64(7), float('inf')),
+]
+
+
+@pytest.mark.parametrize('column_formats', formats)
+@pytest.mark.parametrize('data', values)
+def test_line_format(column_formats, data):  # same as formatting column by column
+    if column_formats[0] == 'd':
+        data = (int(data[0]),) + data[1:]
+    csv_file = CsvFile('data.tsv', column_names=('a', 'b', 'c'),
+                       column_formats=column_formats)
+    expected = '\t'.join(f'{x:{fmt}}' for x, fmt in zip(data, column_formats)) + '\n'
+    assert csv_file._format_line(data) == expected
+
+
+# =============================== Misc. tools =================================
+
+
+def test_ring_queue_overflow():  # oldest elements are dropped
+    queue = RingQueue(maxsize=3)
+    for i in range(5):
+        queue.put(i)
+    assert queue.full()
+    assert queue.get() == 2
+    assert get_all_from_queue(queue) == [3, 4]
+    assert queue.empty()
+    for i in range(5):
+        queue.put(i)
+    assert get_last_from_queue(queue) == 4
+    assert get_last_from_queue(queue) is None
+
+
+def test_drain_queue_task_done():  # task accounting left to the caller
+    queue = Queue()
+    for i in range(3):
+        queue.put(i)
+    assert get_all_from_queue(queue) == [0, 1, 2]
+    for _ in range(3):
+        queue.task_done()
+    queue.join()
+
+
+def test_get_all_from_queue_max_elements():  # oldest elements taken first
+    queue = Queue()
+    for i in range(5):
+        queue.put(i)
+    assert get_all_from_queue(queue, max_elements=3) == [0, 1, 2]
+    assert get_all_from_queue(queue, max_elements=3) == [3, 4]
+
+
+def test_increment_filename(tmp_path):
+    file = tmp_path / 'Metadata.json'
+    assert increment_filename(file) == tmp_path / 'Metadata-1.json'
+    for name in 'Metadata.json', 'Metadata-1.json', 'Metadata-2.json', 'Other-5.json':
+        (tmp_path / name).touch()
+    assert increment_filename(file) == tmp_path / 'Metadata-3.json'
+
+
+# ============================== Plotting tools ===============================
+
+
+def test_data_buffer_growth():  # all data kept, capacity increases
+    buffer = DataBuffer(n_channels=2, capacity=4)
+    for i in range(10):
+        times = np.arange(3) + 3 * i
+        buffer.append(times, np.vstack((times, -times)))
+    assert len(buffer) == buffer.count == 30
+    assert buffer.capacity >= 30
+    assert np.array_equal(buffer.current_times, np.arange(30))
+    assert np.array_equal(buffer.current_values[1], -np.arange(30))
+
+
+def test_data_buffer_max_size():  # sliding window of most recent data
+    buffer = DataBuffer(n_channels=1, capacity=4, max_size=5)
+    for i in range(10):
+        times = np.arange(3) + 3 * i
+        buffer.append(times, times[None, :])
+        assert len(buffer) == min(5, 3 * (i + 1))
+        assert buffer.current_times[-1] == times[-1]
+    assert buffer.count == 30
+    assert buffer.capacity <= 10
+    assert np.array_equal(buffer.current_times, np.arange(25, 30))
+    buffer.append(np.arange(100, 120), np.arange(100, 120)[None, :])  # > max_size
+    assert np.array_equal(buffer.current_values[0], np.arange(115, 120))
+
+
+def test_minmax_downsample():  # envelope kept, times of bucket edges
+    times = np.arange(103, dtype=float)
+    values = np.sin(times)
+    new_times, new_values = minmax_downsample(times, values, n_buckets=10)
+    # 10 buckets of 10 points (min + max) + 3 remaining points
+    assert len(new_times) == len(new_values) == 23
+    assert np.array_equal(new_times[:4], [0, 9, 10, 19])
+    assert np.array_equal(new_times[-3:], [100, 101, 102])
+    assert new_values[0] == values[:10].min()
+    assert new_values[1] == values[:10].max()
+    assert new_values.min() == values.min()
+    assert new_values.max() == values.max()
+
+
+def test_minmax_downsample_channels():  # several channels at once
+    times = np.arange(103, dtype=float)
+    values = np.sin(times)
+    _, new_values = minmax_downsample(times, values, n_buckets=10)
+    values_2d = np.vstack((values, np.cos(times)))
+    _, new_values_2d = minmax_downsample(times, values_2d, n_buckets=10)
+    assert np.array_equal(new_values_2d[0], new_values)
+    assert np.array_equal(new_values_2d[1], minmax_downsample(times, np.cos(times), 10)[1])
+
+
+@pytest.mark.parametrize('n, n_buckets', [(0, 10), (5, 10), (20, 10), (29, 10), (30, 0)])
+def test_minmax_downsample_no_reduction(n, n_buckets):  # e.g. less than 3 pts/bucket
+    times = np.arange(n, dtype=float)
+    values = np.random.rand(2, n)
+    new_times, new_values = minmax_downsample(times, values, n_buckets)
+    if n_buckets == 0 and n == 30:  # one bucket of all points
+        assert np.array_equal(new_times, [0, 29])
+        assert np.array_equal(new_values, np.vstack((values.min(axis=1), values.max(axis=1))).T)
+    else:
+        assert new_times is times and new_values is values
+
+
+class DummyImageSensor(SensorBase):
+    name = 'Cam'
+
+    def _read(self):
+        return {'image': np.zeros((4, 5), dtype=np.uint8)}
+
+
+def test_copy_images_viewer_frame(tmp_path):  # pooled arrays reused after save
+    recording = ImageRecording(DummyImageSensor, 'Cam.tsv', path=tmp_path,
+                               extension='.png', copy_images=True)
+    first = np.full((4, 5), 7, dtype=np.uint8)
+    measurement = recording.format_measurement({'image': first})
+    displayed = recording.measurement_for_queue(measurement, 'plotting')
+    recording._release_image(measurement)  # image saved
+    second = np.full((4, 5), 9, dtype=np.uint8)
+    new_measurement = recording.format_measurement({'image': second})
+    assert new_measurement['image'] is measurement['image']  # array reused
+    assert (displayed['image'] == 7).all()
+
+
+def test_image_save_outside_data_save(tmp_path):  # no saving threads running
+    recording = ImageRecording(DummyImageSensor, 'Cam.tsv', path=tmp_path,
+                               extension='.png', image_saving_threads=2,
+                               column_names=('num', 'filename'))
+    measurement = recording.format_measurement(DummyImageSensor()._read())
+    with open(recording.file_manager.file, 'a', encoding='utf8') as file:
+        recording.save(measurement, file)
+        recording.flush(file)
+    assert len(list(recording.image_path.glob('*.png'))) == 1
+    assert recording.file_manager.number_of_lines() == 1
+
+class DummyNumericalSensor(SensorBase):
+    name = 'P'
+
+    def _get_data(self):
+        return (1.0, 2.0)
+
+
+def test_buffered_lines_written_after_saving(tmp_path):  # e.g. saving failed
+    recording = NumericalRecording(DummyNumericalSensor, 'P.tsv', tmp_path,
+                                   column_names=('time (unix)', 'dt (s)', 'a', 'b'))
+    recording.file_manager.init_file()
+    for i in range(10):
+        recording.file_manager._buffer_line((i, 0, 1.0, 2.0))
+    recording.after_saving()
+    assert not recording.file_manager.buffer
+    assert recording.file_manager.number_of_measurements() == 10